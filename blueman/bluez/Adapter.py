@@ -1,7 +1,7 @@
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, Any
 from blueman.bluemantyping import ObjectPath
 
-from gi.repository import GLib
+from gi.repository import GLib, Gio
 
 from blueman.bluez.AnyBase import AnyBase
 from blueman.bluez.Base import Base
@@ -11,12 +11,27 @@ from blueman.bluez.errors import BluezDBusException
 
 class Adapter(Base):
     _interface_name = 'org.bluez.Adapter1'
+    _timeouts = {'StartDiscovery': 10000, 'StopDiscovery': 10000, 'SetDiscoveryFilter': 10000,
+                 'RemoveDevice': 15000}
+
+    __filter_signatures = {'UUIDs': 'as', 'RSSI': 'n', 'Pathloss': 'q', 'Transport': 's', 'DuplicateData': 'b',
+                           'Discoverable': 'b', 'Pattern': 's'}
 
     def __init__(self, obj_path: ObjectPath):
         super().__init__(obj_path=obj_path)
 
-    def start_discovery(self, error_handler: Optional[Callable[[BluezDBusException], None]] = None) -> None:
-        self._call('StartDiscovery', error_handler=error_handler)
+    def start_discovery(self, error_handler: Optional[Callable[[BluezDBusException], None]] = None) -> Gio.Cancellable:
+        return self._call('StartDiscovery', error_handler=error_handler)
+
+    def set_discovery_filter(
+        self,
+        discovery_filter: Dict[str, Any],
+        error_handler: Optional[Callable[[BluezDBusException], None]] = None,
+    ) -> Gio.Cancellable:
+        # An empty filter removes the one set before
+        param = GLib.Variant('(a{sv})', ({key: GLib.Variant(self.__filter_signatures[key], value)
+                                          for key, value in discovery_filter.items()},))
+        return self._call('SetDiscoveryFilter', param, error_handler=error_handler)
 
     def stop_discovery(self) -> None:
         self._call('StopDiscovery')
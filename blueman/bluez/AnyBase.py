@@ -1,14 +1,19 @@
 import weakref
+from typing import Dict, Any, List
 
-from gi.repository import GObject, GLib
+from gi.repository import GObject
 from gi.repository import Gio
 
 from blueman.bluemantyping import GSignals
+from blueman.bluez.PropertiesBatcher import PropertiesBatcher
+from blueman.bluez.PropertiesDispatcher import PropertiesDispatcher
 
 
 class AnyBase(GObject.GObject):
     __gsignals__: GSignals = {
-        'property-changed': (GObject.SignalFlags.NO_HOOKS, None, (str, object, str))
+        'property-changed': (GObject.SignalFlags.NO_HOOKS, None, (str, object, str)),
+        # @param: object path, {key: value} with None for invalidated keys
+        'properties-changed': (GObject.SignalFlags.NO_HOOKS, None, (str, object)),
     }
 
     connect_signal = GObject.GObject.connect
@@ -17,33 +22,29 @@ class AnyBase(GObject.GObject):
     def __init__(self, interface_name: str):
         super().__init__()
 
-        bus = Gio.bus_get_sync(Gio.BusType.SYSTEM)
-
         this = weakref.proxy(self)
 
-        def on_signal(
-            _connection: Gio.DBusConnection,
-            _sender_name: str,
+        self._batcher = PropertiesBatcher(lambda path, changed: this.emit('properties-changed', path, changed))
+        weakref.finalize(self, self._batcher.cancel)
+
+        def on_properties_changed(
             object_path: str,
             _interface_name: str,
-            _signal_name: str,
-            param: GLib.Variant,
+            changed: Dict[str, Any],
+            invalidated: List[str],
         ) -> None:
-            iface_name, changed, invalidated = param.unpack()
-            if iface_name == interface_name and this is not None:
-                for key in list(changed) + invalidated:
-                    this.emit('property-changed', key, changed.get(key, None), object_path)
+            for key in list(changed) + invalidated:
+                this.emit('property-changed', key, changed.get(key, None), object_path)
 
+            this._batcher.push(object_path, dict(changed, **dict.fromkeys(invalidated)))
+
+        dispatcher = PropertiesDispatcher.get_instance(Gio.BusType.SYSTEM, "org.bluez")
         weakref.finalize(
             self,
-            bus.signal_unsubscribe,
-            bus.signal_subscribe(
-                "org.bluez",
-                "org.freedesktop.DBus.Properties",
-                "PropertiesChanged",
-                None,
-                None,
-                Gio.DBusSignalFlags.NONE,
-                on_signal
-            )
+            dispatcher.remove_listener,
+            dispatcher.add_listener(interface_name, None, on_properties_changed)
         )
+
+    def set_throttle(self, key: str, milliseconds: int) -> None:
+        # Applies to properties-changed only, 0 delivers every change again
+        self._batcher.set_window(key, milliseconds)
@@ -1,113 +1,225 @@
-from typing import List, Callable, Optional, Any, Union, Dict
+from collections import OrderedDict
+from typing import List, Callable, Optional, Any, Union, Dict, Tuple, Set
+import weakref
+
 from blueman.bluemantyping import GSignals, ObjectPath
 
 from gi.repository import Gio, GLib, GObject
 from gi.types import GObjectMeta
-from blueman.bluez.errors import parse_dbus_error, BluezDBusException
+from blueman.bluez.errors import parse_dbus_error, BluezDBusException, DBusCancelledError
+from blueman.bluez.PropertiesBatcher import PropertiesBatcher
+from blueman.bluez.PropertiesDispatcher import PropertiesDispatcher
+from blueman.bluez.PropertyCache import PropertyCache
 import logging
 
+_Caller = Tuple[Gio.Cancellable, Optional[Callable[..., None]], Optional[Callable[[BluezDBusException], None]]]
+
 
 class BaseMeta(GObjectMeta):
+    # Instances are only held weakly, the most recently requested ones are kept alive up to this limit
+    registry_limit = 256
+
+    _recent: "OrderedDict[Tuple[BaseMeta, str], Base]" = OrderedDict()
+    _registries: "List[weakref.WeakValueDictionary[str, Base]]" = []
+    # Instances with connected handlers, their signals have to keep firing however long ago they were requested
+    _connected: "Dict[Tuple[BaseMeta, str], Base]" = {}
+
     def __call__(cls, *args: object, **kwargs: str) -> "Base":
         if not hasattr(cls, "__instances__"):
-            cls.__instances__: Dict[str, "Base"] = {}
+            cls.__instances__: "weakref.WeakValueDictionary[str, Base]" = weakref.WeakValueDictionary()
+            BaseMeta._registries.append(cls.__instances__)
 
         path = kwargs.get('obj_path')
         if path is None:
             path = getattr(cls, "_obj_path")
 
-        if path in cls.__instances__:
-            return cls.__instances__[path]
+        instance = cls.__instances__.get(path)
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            cls.__instances__[path] = instance
 
-        instance: "Base" = super().__call__(*args, **kwargs)
-        cls.__instances__[path] = instance
+        recent = BaseMeta._recent
+        recent[(cls, path)] = instance
+        recent.move_to_end((cls, path))
+        while len(recent) > BaseMeta.registry_limit:
+            recent.popitem(last=False)
 
         return instance
 
+    def evict(cls, path: str) -> None:
+        if hasattr(cls, "__instances__"):
+            cls.__instances__.pop(path, None)
+        BaseMeta._recent.pop((cls, path), None)
+        BaseMeta._connected.pop((cls, path), None)
+
+    @staticmethod
+    def live_instances() -> int:
+        return sum(len(registry) for registry in BaseMeta._registries)
+
 
 class Base(GObject.Object, metaclass=BaseMeta):
     __name = 'org.bluez'
     __bus_type = Gio.BusType.SYSTEM
-    __proxy: Gio.DBusProxy
 
     __gsignals__: GSignals = {
-        'property-changed': (GObject.SignalFlags.NO_HOOKS, None, (str, object, str))
+        'property-changed': (GObject.SignalFlags.NO_HOOKS, None, (str, object, str)),
+        # @param: object path, {key: value} with None for invalidated keys
+        'properties-changed': (GObject.SignalFlags.NO_HOOKS, None, (str, object)),
     }
-    __instances__: Dict[str, "Base"]
+    __instances__: "weakref.WeakValueDictionary[str, Base]"
 
     _interface_name: str
-
-    connect_signal = GObject.GObject.connect
-    disconnect_signal = GObject.GObject.disconnect
+    # Default deadlines in milliseconds per method name, methods not listed wait indefinitely
+    _timeouts: Dict[str, int] = {}
 
     def __init__(self, *, obj_path: ObjectPath):
         super().__init__()
 
-        self.__proxy = Gio.DBusProxy.new_for_bus_sync(
-            self.__bus_type,
-            Gio.DBusProxyFlags.NONE,
-            None,
-            self.__name,
-            obj_path,
-            self._interface_name,
-            None
-        )
+        # No proxy and no I/O here, properties come from the cache and calls go straight to the connection
+        self.__bus = Gio.bus_get_sync(self.__bus_type)
+        self.__obj_path = obj_path
+
+        self.__cache = PropertyCache.get_instance(self.__bus_type, self.__name)
+        self.__cache.track(self._interface_name)
+
+        this = weakref.proxy(self)
 
-        self.__proxy.connect("g-properties-changed", self._properties_changed)
+        self.__batcher = PropertiesBatcher(lambda path, changed: this.emit("properties-changed", path, changed))
+        weakref.finalize(self, self.__batcher.cancel)
+
+        def on_properties_changed(_object_path: str, _interface_name: str, changed: Dict[str, Any],
+                                  invalidated: List[str]) -> None:
+            this._properties_changed(changed, invalidated)
+
+        dispatcher = PropertiesDispatcher.get_instance(self.__bus_type, self.__name)
+        self.__listener = weakref.finalize(
+            self,
+            dispatcher.remove_listener,
+            dispatcher.add_listener(self._interface_name, obj_path, on_properties_changed)
+        )
 
         self.__fallback = {'Icon': 'blueman', 'Class': 0, 'Appearance': 0}
 
         self.__variant_map = {str: 's', int: 'u', bool: 'b'}
 
-    def _properties_changed(self, _proxy: Gio.DBusProxy, changed_properties: GLib.Variant,
-                            invalidated_properties: List[str]) -> None:
-        changed = changed_properties.unpack()
+        self.__in_flight: Dict[Tuple[str, Optional[str]], Tuple[Gio.Cancellable, List[_Caller]]] = {}
+
+        self.__handler_ids: Set[int] = set()
+
+    def connect_signal(self, signal: str, handler: Callable[..., Any], *args: Any) -> int:
+        handler_id: int = GObject.GObject.connect(self, signal, handler, *args)
+        self.__handler_ids.add(handler_id)
+        BaseMeta._connected[(type(self), self.__obj_path)] = self
+        return handler_id
+
+    def disconnect_signal(self, handler_id: int) -> None:
+        GObject.GObject.disconnect(self, handler_id)
+        self.__handler_ids.discard(handler_id)
+        if not self.__handler_ids:
+            BaseMeta._connected.pop((type(self), self.__obj_path), None)
+
+    def _properties_changed(self, changed: Dict[str, Any], invalidated_properties: List[str]) -> None:
         object_path = self.get_object_path()
         logging.debug(f"{object_path} {changed} {invalidated_properties} {self}")
 
         for key in list(changed) + invalidated_properties:
             self.emit("property-changed", key, changed.get(key, None), object_path)
 
+        self.__batcher.push(object_path, dict(changed, **dict.fromkeys(invalidated_properties)))
+
+    def set_throttle(self, key: str, milliseconds: int) -> None:
+        # Applies to properties-changed only, 0 delivers every change again
+        self.__batcher.set_window(key, milliseconds)
+
     def _call(
         self,
         method: str,
         param: Optional[GLib.Variant] = None,
         reply_handler: Optional[Callable[..., None]] = None,
         error_handler: Optional[Callable[[BluezDBusException], None]] = None,
-    ) -> None:
-        def callback(
-            proxy: Gio.DBusProxy,
-            result: Gio.AsyncResult,
-            reply: Optional[Callable[..., None]],
-            error: Optional[Callable[[BluezDBusException], None]],
-        ) -> None:
+        timeout: Optional[int] = None,
+    ) -> Gio.Cancellable:
+        # Identical calls still waiting for a reply share it. Every caller gets its own handle, the shared call is
+        # only cancelled once all of them are, callers that cancelled before get their error with the reply.
+        key = (method, None if param is None else param.print_(True))
+        cancellable = Gio.Cancellable()
+        GObject.GObject.connect(cancellable, "cancelled", lambda _cancellable: self.__caller_cancelled(key))
+
+        if key in self.__in_flight:
+            self.__in_flight[key][1].append((cancellable, reply_handler, error_handler))
+            logging.debug(f"Coalesced {self._interface_name}.{method} on {self.__obj_path}")
+            return cancellable
+
+        callers = [(cancellable, reply_handler, error_handler)]
+
+        def callback(_connection: Optional[GObject.Object], result: Gio.AsyncResult,
+                     _user_data: Optional[object] = None) -> None:
+            # Identical calls made after this one was cancelled went out on their own
+            in_flight = self.__in_flight.get(key)
+            if in_flight is not None and in_flight[1] is callers:
+                del self.__in_flight[key]
             try:
-                value = proxy.call_finish(result).unpack()
-                if reply:
-                    reply(*value)
+                value = self.__bus.call_finish(result).unpack()
+                error = None
             except GLib.Error as e:
-                if error:
-                    error(parse_dbus_error(e))
-                else:
-                    logging.error(f"Unhandled error for {self.__proxy.get_interface_name()}.{method}", exc_info=True)
+                error = parse_dbus_error(e)
+
+            for caller, on_reply, on_error in callers:
+                if caller.is_cancelled() and error is None:
+                    self.__call_failed(method, on_error, DBusCancelledError("Operation was cancelled"))
+                elif error is not None:
+                    self.__call_failed(method, on_error, error)
+                elif on_reply:
+                    on_reply(*value)
+
+        if timeout is None:
+            timeout = self._timeouts.get(method, GLib.MAXINT)
 
-        self.__proxy.call(method, param, Gio.DBusCallFlags.NONE, GLib.MAXINT, None,
-                          callback, reply_handler, error_handler)
+        shared = Gio.Cancellable()
+        self.__in_flight[key] = (shared, callers)
+        self.__bus.call(self.__name, self.__obj_path, self._interface_name, method, param, None,
+                        Gio.DBusCallFlags.NONE, timeout, shared, callback)
+        return cancellable
+
+    def __caller_cancelled(self, key: Tuple[str, Optional[str]]) -> None:
+        if key not in self.__in_flight:
+            return
+
+        shared, callers = self.__in_flight[key]
+        if all(caller.is_cancelled() for caller, _reply, _error in callers):
+            # Identical calls from now on are not merged onto the cancelled one
+            del self.__in_flight[key]
+            shared.cancel()
+
+    def __call_failed(self, method: str, error_handler: Optional[Callable[[BluezDBusException], None]],
+                      error: BluezDBusException) -> None:
+        if error_handler:
+            error_handler(error)
+        else:
+            logging.error(f"Unhandled error for {self._interface_name}.{method}: {error}")
+
+    def _call_properties_sync(self, method: str, param: GLib.Variant) -> GLib.Variant:
+        return self.__bus.call_sync(self.__name, self.__obj_path, 'org.freedesktop.DBus.Properties', method, param,
+                                    None, Gio.DBusCallFlags.NONE, GLib.MAXINT, None)
 
     def get(self, name: str) -> Any:
+        object_path = self.get_object_path()
         try:
-            prop = self.__proxy.call_sync(
-                'org.freedesktop.DBus.Properties.Get',
-                GLib.Variant('(ss)', (self._interface_name, name)),
-                Gio.DBusCallFlags.NONE,
-                GLib.MAXINT,
-                None)
-            return prop.unpack()[0]
+            return self.__cache.get(object_path, self._interface_name, name)
+        except KeyError:
+            # Such as Class and Appearance of LE devices, asking would only fail
+            if self.__cache.is_complete(object_path, self._interface_name):
+                if name in self.__fallback:
+                    return self.__fallback[name]
+                raise BluezDBusException(f"org.freedesktop.DBus.Error.InvalidArgs No such property '{name}'")
+
+        try:
+            prop = self._call_properties_sync('Get', GLib.Variant('(ss)', (self._interface_name, name)))
+            value = prop.unpack()[0]
+            self.__cache.store(object_path, self._interface_name, name, value)
+            return value
         except GLib.Error as e:
-            property = self.__proxy.get_cached_property(name)
-            if property is not None:
-                return property.unpack()
-            elif name in self.__fallback:
+            if name in self.__fallback:
                 return self.__fallback[name]
             else:
                 raise parse_dbus_error(e)
@@ -115,24 +227,27 @@ class Base(GObject.Object, metaclass=BaseMeta):
     def set(self, name: str, value: Union[str, int, bool]) -> None:
         v = GLib.Variant(self.__variant_map[type(value)], value)
         param = GLib.Variant('(ssv)', (self._interface_name, name, v))
-        self.__proxy.call('org.freedesktop.DBus.Properties.Set',
-                          param,
-                          Gio.DBusCallFlags.NONE,
-                          GLib.MAXINT,
-                          None)
+        self.__bus.call(self.__name, self.__obj_path, 'org.freedesktop.DBus.Properties', 'Set', param, None,
+                        Gio.DBusCallFlags.NONE, GLib.MAXINT, None)
 
     def get_object_path(self) -> ObjectPath:
-        return ObjectPath(self.__proxy.get_object_path())
+        return self.__obj_path
 
-    def get_properties(self) -> Dict[str, Any]:
-        param = GLib.Variant('(s)', (self._interface_name,))
-        res = self.__proxy.call_sync('org.freedesktop.DBus.Properties.GetAll',
-                                     param,
-                                     Gio.DBusCallFlags.NONE,
-                                     GLib.MAXINT,
-                                     None)
+    def _get_cached_properties(self) -> Dict[str, Any]:
+        object_path = self.get_object_path()
+        try:
+            return self.__cache.get_all(object_path, self._interface_name)
+        except KeyError:
+            pass
+
+        res = self._call_properties_sync('GetAll', GLib.Variant('(s)', (self._interface_name,)))
 
         props: Dict[str, Any] = res.unpack()[0]
+        self.__cache.store_all(object_path, self._interface_name, props)
+        return props
+
+    def get_properties(self) -> Dict[str, Any]:
+        props = dict(self._get_cached_properties())
         for k, v in self.__fallback.items():
             if k in props:
                 continue
@@ -142,8 +257,9 @@ class Base(GObject.Object, metaclass=BaseMeta):
         return props
 
     def destroy(self) -> None:
-        if self.__proxy:
-            del self.__proxy
+        self.__listener()
+        self.__batcher.cancel()
+        type(self).evict(self.__obj_path)
 
     def __getitem__(self, key: str) -> Any:
         return self.get(key)
@@ -152,4 +268,4 @@ class Base(GObject.Object, metaclass=BaseMeta):
         self.set(key, value)
 
     def __contains__(self, key: str) -> bool:
-        return key in self.get_properties()
+        return key in self.__fallback or key in self._get_cached_properties()
@@ -1,6 +1,8 @@
 from typing import Optional, Callable
 from blueman.bluemantyping import ObjectPath
 
+from gi.repository import Gio
+
 from blueman.bluez.Base import Base
 from blueman.bluez.AnyBase import AnyBase
 from blueman.bluez.errors import BluezDBusException
@@ -8,6 +10,7 @@ from blueman.bluez.errors import BluezDBusException
 
 class Device(Base):
     _interface_name = 'org.bluez.Device1'
+    _timeouts = {'Pair': 90000, 'Connect': 45000, 'Disconnect': 15000}
 
     def __init__(self, obj_path: ObjectPath):
         super().__init__(obj_path=obj_path)
@@ -16,22 +19,22 @@ class Device(Base):
         self,
         reply_handler: Optional[Callable[[], None]] = None,
         error_handler: Optional[Callable[[BluezDBusException], None]] = None,
-    ) -> None:
-        self._call('Pair', reply_handler=reply_handler, error_handler=error_handler)
+    ) -> Gio.Cancellable:
+        return self._call('Pair', reply_handler=reply_handler, error_handler=error_handler)
 
     def connect(  # type: ignore
         self,
         reply_handler: Optional[Callable[[], None]] = None,
         error_handler: Optional[Callable[[BluezDBusException], None]] = None,
-    ) -> None:
-        self._call('Connect', reply_handler=reply_handler, error_handler=error_handler)
+    ) -> Gio.Cancellable:
+        return self._call('Connect', reply_handler=reply_handler, error_handler=error_handler)
 
     def disconnect(  # type: ignore
         self,
         reply_handler: Optional[Callable[[], None]] = None,
         error_handler: Optional[Callable[[BluezDBusException], None]] = None,
-    ) -> None:
-        self._call('Disconnect', reply_handler=reply_handler, error_handler=error_handler)
+    ) -> Gio.Cancellable:
+        return self._call('Disconnect', reply_handler=reply_handler, error_handler=error_handler)
 
     @property
     def display_name(self) -> str:
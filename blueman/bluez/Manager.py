@@ -1,11 +1,16 @@
 import logging
-from typing import List, Optional, Callable
+from typing import List, Optional, Callable, Dict, Any
 
-from gi.repository import GObject, Gio
+from gi.repository import GObject, Gio, GLib
 
 from blueman.bluez.Adapter import Adapter
+from blueman.bluez.Base import BaseMeta
+from blueman.bluez.Battery import Battery
 from blueman.bluez.Device import Device
+from blueman.bluez.Network import Network
 from blueman.bluez.errors import DBusNoSuchAdapterError
+from blueman.bluez.PropertyCache import PropertyCache
+from blueman.bluez.Snapshot import Snapshot, Delta, adapter_record, device_record, battery_record
 from blueman.gobject import SingletonGObjectMeta
 from blueman.bluemantyping import GSignals, BtAddress, ObjectPath
 
@@ -27,10 +32,23 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
 
     def __init__(self) -> None:
         super().__init__()
+        # Subscribed to InterfacesAdded before the object manager, so new objects are cached by the time it emits
+        self._cache = PropertyCache.get_instance(Gio.BusType.SYSTEM, self.__bus_name)
+        for interface_name in ('org.bluez.Adapter1', 'org.bluez.Device1', 'org.bluez.Battery1'):
+            self._cache.track(interface_name)
+
         self._object_manager = Gio.DBusObjectManagerClient.new_for_bus_sync(
             Gio.BusType.SYSTEM, Gio.DBusObjectManagerClientFlags.DO_NOT_AUTO_START,
             self.__bus_name, '/', None, None, None)
 
+        # address -> {adapter path: device path}
+        self._device_index: Dict[BtAddress, Dict[ObjectPath, ObjectPath]] = {}
+        for dbus_object in self._object_manager.get_objects():
+            device_proxy = dbus_object.get_interface('org.bluez.Device1')
+            if device_proxy:
+                assert isinstance(device_proxy, Gio.DBusProxy)
+                self._index_device(device_proxy)
+
         self._object_manager.connect("object-added", self._on_object_added)
         self._object_manager.connect("object-removed", self._on_object_removed)
         self._object_manager.connect("interface-added", self._on_interface_added)
@@ -41,6 +59,11 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
         adapter_proxy = dbus_object.get_interface('org.bluez.Adapter1')
         battery_proxy = dbus_object.get_interface('org.bluez.Battery1')
 
+        for proxy in (adapter_proxy, device_proxy, battery_proxy):
+            if proxy:
+                assert isinstance(proxy, Gio.DBusProxy)
+                self._cache_proxy(proxy)
+
         if adapter_proxy:
             assert isinstance(adapter_proxy, Gio.DBusProxy)
             object_path = adapter_proxy.get_object_path()
@@ -50,6 +73,7 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
             assert isinstance(device_proxy, Gio.DBusProxy)
             object_path = device_proxy.get_object_path()
             logging.debug(f"Device1: {object_path}")
+            self._index_device(device_proxy)
             self.emit('device-created', object_path)
         if battery_proxy:
             assert isinstance(device_proxy, Gio.DBusProxy)
@@ -57,6 +81,21 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
             logging.debug(f"Battery1: {object_path}")
             self.emit('battery-created', object_path)
 
+    def _cache_proxy(self, proxy: Gio.DBusProxy) -> None:
+        # Signal delivery order is up to GDBus, if the object manager came first its proxy holds every property
+        object_path = ObjectPath(proxy.get_object_path())
+        interface_name = proxy.get_interface_name()
+        if self._cache.is_complete(object_path, interface_name):
+            return
+
+        props = {}
+        for name in proxy.get_cached_property_names() or []:
+            value = proxy.get_cached_property(name)
+            if value is not None:
+                props[name] = value.unpack()
+        if props:
+            self._cache.store_all(object_path, interface_name, props)
+
     def _on_object_removed(self, _object_manager: Gio.DBusObjectManager, dbus_object: Gio.DBusObject) -> None:
         device_proxy = dbus_object.get_interface('org.bluez.Device1')
         adapter_proxy = dbus_object.get_interface('org.bluez.Adapter1')
@@ -71,6 +110,7 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
             assert isinstance(device_proxy, Gio.DBusProxy)
             object_path = device_proxy.get_object_path()
             logging.debug(object_path)
+            self._unindex_device(device_proxy)
             self.emit('device-removed', object_path)
         if battery_proxy:
             assert isinstance(device_proxy, Gio.DBusProxy)
@@ -78,11 +118,18 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
             logging.debug(object_path)
             self.emit('battery-removed', object_path)
 
+        object_path = dbus_object.get_object_path()
+        for cls in (Adapter, Device, Battery, Network):
+            cls.evict(object_path)
+        logging.debug(f"{BaseMeta.live_instances()} live proxies")
+
     def _on_interface_added(self, _object_manager: Gio.DBusObjectManager, dbus_object: Gio.DBusObject,
                             _dbus_interface: Gio.DBusInterface) -> None:
         object_path = dbus_object.get_object_path()
         battery = dbus_object.get_interface("org.bluez.Battery1")
         if battery is not None:
+            assert isinstance(battery, Gio.DBusProxy)
+            self._cache_proxy(battery)
             logging.debug(f"Battery1 added to {object_path}")
             self.emit('battery-created', object_path)
 
@@ -93,6 +140,31 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
         if battery is not None:
             logging.debug(f"Battery1 removed from {object_path}")
             self.emit('battery-removed', object_path)
+            Battery.evict(object_path)
+
+    def _index_device(self, device_proxy: Gio.DBusProxy) -> None:
+        address = device_proxy.get_cached_property('Address')
+        adapter = device_proxy.get_cached_property('Adapter')
+        if address is None or adapter is None:
+            logging.warning(f"Not indexing {device_proxy.get_object_path()}, properties not loaded")
+            return
+
+        paths = self._device_index.setdefault(BtAddress(address.unpack()), {})
+        paths[ObjectPath(adapter.unpack())] = ObjectPath(device_proxy.get_object_path())
+
+    def _unindex_device(self, device_proxy: Gio.DBusProxy) -> None:
+        object_path = device_proxy.get_object_path()
+        address = device_proxy.get_cached_property('Address')
+        if address is None:
+            return
+
+        paths = self._device_index.get(address.unpack(), {})
+        for adapter_path, device_path in list(paths.items()):
+            if device_path == object_path:
+                del paths[adapter_path]
+
+        if not paths:
+            self._device_index.pop(address.unpack(), None)
 
     def get_adapters(self) -> List[Adapter]:
         paths: List[ObjectPath] = []
@@ -141,11 +213,64 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
             if object_path.startswith(adapter_path):
                 self._on_object_added(self._object_manager, obj_proxy)
 
+    def populate_batteries(self, adapter_path: ObjectPath = ObjectPath("/")) -> None:
+        for object_path, _props in self._cache.get_objects('org.bluez.Battery1'):
+            if object_path.startswith(adapter_path):
+                self.emit('battery-created', object_path)
+
     def find_device(self, address: BtAddress, adapter_path: ObjectPath = ObjectPath("/")) -> Optional[Device]:
-        for device in self.get_devices(adapter_path):
-            if device['Address'] == address:
-                return device
-        return None
+        paths = self._device_index.get(address)
+        if not paths:
+            return None
+
+        if adapter_path == "/":
+            object_path: Optional[ObjectPath] = next(iter(paths.values()))
+        else:
+            object_path = paths.get(adapter_path)
+
+        return None if object_path is None else Device(obj_path=object_path)
+
+    @property
+    def generation(self) -> int:
+        # What since() takes to return the changes from now on
+        return self._cache.generation
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(
+            self._cache.generation,
+            tuple(adapter_record(path, props) for path, props in self._cache.get_objects('org.bluez.Adapter1')),
+            tuple(device_record(path, props) for path, props in self._cache.get_objects('org.bluez.Device1')),
+            tuple(battery_record(path, props) for path, props in self._cache.get_objects('org.bluez.Battery1')),
+        )
+
+    def since(self, generation: int) -> Optional[Delta]:
+        # None means the changes are no longer known and a new snapshot has to be taken
+        adapters = self._cache.changes_since(generation, 'org.bluez.Adapter1')
+        devices = self._cache.changes_since(generation, 'org.bluez.Device1')
+        batteries = self._cache.changes_since(generation, 'org.bluez.Battery1')
+        if adapters is None or devices is None or batteries is None:
+            return None
+
+        def props(path: str, interface_name: str) -> Dict[str, Any]:
+            try:
+                return self._cache.get_all(ObjectPath(path), interface_name)
+            except KeyError:
+                # Only some properties were read so far, all are read rather than leaving the change out
+                return self._cache.load(ObjectPath(path), interface_name)
+
+        try:
+            return Delta(
+                self._cache.generation,
+                tuple(adapter_record(path, props(path, 'org.bluez.Adapter1')) for path in adapters[0]),
+                tuple(device_record(path, props(path, 'org.bluez.Device1')) for path in devices[0]),
+                tuple(battery_record(path, props(path, 'org.bluez.Battery1')) for path in batteries[0]),
+                tuple(ObjectPath(path) for path in adapters[1]),
+                tuple(ObjectPath(path) for path in devices[1]),
+                tuple(ObjectPath(path) for path in batteries[1]),
+            )
+        except GLib.Error as e:
+            logging.debug(f"Could not read changed properties again: {e.message}")
+            return None
 
     @classmethod
     def watch_name_owner(
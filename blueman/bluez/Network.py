@@ -3,13 +3,14 @@ from blueman.bluemantyping import ObjectPath
 
 from blueman.bluez.Base import Base
 from blueman.bluez.AnyBase import AnyBase
-from gi.repository import GLib
+from gi.repository import GLib, Gio
 
 from blueman.bluez.errors import BluezDBusException
 
 
 class Network(Base):
     _interface_name = 'org.bluez.Network1'
+    _timeouts = {'Connect': 45000, 'Disconnect': 15000}
 
     def __init__(self, obj_path: ObjectPath):
         super().__init__(obj_path=obj_path)
@@ -19,16 +20,16 @@ class Network(Base):
         uuid: str,
         reply_handler: Optional[Callable[[str], None]] = None,
         error_handler: Optional[Callable[[BluezDBusException], None]] = None,
-    ) -> None:
+    ) -> Gio.Cancellable:
         param = GLib.Variant('(s)', (uuid,))
-        self._call('Connect', param, reply_handler=reply_handler, error_handler=error_handler)
+        return self._call('Connect', param, reply_handler=reply_handler, error_handler=error_handler)
 
     def disconnect(  # type: ignore
         self,
         reply_handler: Optional[Callable[[], None]] = None,
         error_handler: Optional[Callable[[BluezDBusException], None]] = None,
-    ) -> None:
-        self._call('Disconnect', reply_handler=reply_handler, error_handler=error_handler)
+    ) -> Gio.Cancellable:
+        return self._call('Disconnect', reply_handler=reply_handler, error_handler=error_handler)
 
 
 class AnyNetwork(AnyBase):
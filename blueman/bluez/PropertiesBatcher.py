@@ -0,0 +1,92 @@
+import time
+from typing import Dict, Any, Callable, Tuple
+
+from gi.repository import GLib
+
+
+class PropertiesBatcher:
+    """Hands on one dictionary per change, keys with a window set are passed on at most once per window and
+    object path, holding back the latest value until the window has passed"""
+
+    def __init__(self, emit: Callable[[str, Dict[str, Any]], None]) -> None:
+        self._emit = emit
+        self._windows: Dict[str, float] = {}
+        self._held: Dict[str, Dict[str, Any]] = {}
+        self._delivered: Dict[Tuple[str, str], float] = {}
+        self._sources: Dict[str, int] = {}
+        self._pruned = float("-inf")
+
+    def set_window(self, key: str, milliseconds: int) -> None:
+        if milliseconds > 0:
+            self._windows[key] = milliseconds / 1000
+        else:
+            self._windows.pop(key, None)
+
+    def push(self, object_path: str, changed: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        deliver = {}
+        held = self._held.get(object_path, {})
+        for key, value in changed.items():
+            window = self._windows.get(key)
+            if window is None:
+                deliver[key] = value
+            elif key not in held and now >= self._delivered.get((object_path, key), float("-inf")) + window:
+                deliver[key] = value
+                self._delivered[(object_path, key)] = now
+            else:
+                held = self._held.setdefault(object_path, held)
+                held[key] = value
+
+        if held and object_path not in self._sources:
+            self._schedule(object_path, now)
+
+        if self._delivered and now >= self._pruned + max(self._windows.values(), default=0.0):
+            self._prune(now)
+
+        if deliver:
+            self._emit(object_path, deliver)
+
+    def forget(self, object_path: str) -> None:
+        self._held.pop(object_path, None)
+        source = self._sources.pop(object_path, None)
+        if source is not None:
+            GLib.source_remove(source)
+        for key in [key for key in self._delivered if key[0] == object_path]:
+            del self._delivered[key]
+
+    def cancel(self) -> None:
+        for source in self._sources.values():
+            GLib.source_remove(source)
+        self._sources = {}
+        self._held = {}
+
+    def _due(self, object_path: str, key: str) -> float:
+        return self._delivered.get((object_path, key), float("-inf")) + self._windows.get(key, 0.0)
+
+    def _prune(self, now: float) -> None:
+        # Delivery times past their window hold nothing back anymore, dropping them keeps paths that are gone from
+        # piling up
+        self._pruned = now
+        for key in [key for key in self._delivered if self._due(*key) <= now]:
+            del self._delivered[key]
+
+    def _schedule(self, object_path: str, now: float) -> None:
+        due = min(self._due(object_path, key) for key in self._held[object_path])
+        self._sources[object_path] = GLib.timeout_add(max(int((due - now) * 1000), 0), self._flush, object_path)
+
+    def _flush(self, object_path: str) -> bool:
+        del self._sources[object_path]
+        now = time.monotonic()
+        held = self._held[object_path]
+        deliver = {key: held.pop(key) for key in list(held) if self._due(object_path, key) <= now + 0.001}
+        for key in deliver:
+            self._delivered[(object_path, key)] = now
+
+        if held:
+            self._schedule(object_path, now)
+        else:
+            del self._held[object_path]
+
+        if deliver:
+            self._emit(object_path, deliver)
+        return False
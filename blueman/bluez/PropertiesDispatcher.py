@@ -0,0 +1,98 @@
+import logging
+import time
+from typing import Dict, Any, List, Tuple, Optional, Callable
+
+from gi.repository import Gio, GLib
+
+PropertiesCallback = Callable[[str, str, Dict[str, Any], List[str]], None]
+
+
+class PropertiesDispatcher:
+    """Single PropertiesChanged subscription per interface, unpacked once and routed by object path"""
+
+    __instances: Dict[Tuple[Gio.BusType, str], "PropertiesDispatcher"] = {}
+
+    rate_log_interval = 60
+
+    @classmethod
+    def get_instance(cls, bus_type: Gio.BusType, name: str) -> "PropertiesDispatcher":
+        key = (bus_type, name)
+        if key not in cls.__instances:
+            cls.__instances[key] = cls(bus_type, name)
+        return cls.__instances[key]
+
+    def __init__(self, bus_type: Gio.BusType, name: str) -> None:
+        self._name = name
+        self._bus = Gio.bus_get_sync(bus_type)
+
+        self._subscriptions: Dict[str, int] = {}
+        self._listener_counts: Dict[str, int] = {}
+        # (interface, object path or None for all paths) -> callbacks
+        self._listeners: Dict[Tuple[str, Optional[str]], List[PropertiesCallback]] = {}
+        self._first: Dict[str, List[PropertiesCallback]] = {}
+        self._handles: Dict[int, Tuple[str, Optional[str], PropertiesCallback, bool]] = {}
+        self._next_handle = 1
+
+        self._counts: Dict[str, int] = {}
+        self._counting_since = time.monotonic()
+
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            GLib.timeout_add_seconds(self.rate_log_interval, self._log_rates)
+
+    def add_listener(self, interface_name: str, object_path: Optional[str], callback: PropertiesCallback,
+                     first: bool = False) -> int:
+        # first listeners run before all others, e.g. so the property cache is current when they are called
+        if interface_name not in self._subscriptions:
+            self._subscriptions[interface_name] = self._bus.signal_subscribe(
+                self._name, "org.freedesktop.DBus.Properties", "PropertiesChanged", None, interface_name,
+                Gio.DBusSignalFlags.NONE, self._on_properties_changed)
+        self._listener_counts[interface_name] = self._listener_counts.get(interface_name, 0) + 1
+
+        if first:
+            self._first.setdefault(interface_name, []).append(callback)
+        else:
+            self._listeners.setdefault((interface_name, object_path), []).append(callback)
+
+        handle = self._next_handle
+        self._next_handle += 1
+        self._handles[handle] = (interface_name, object_path, callback, first)
+        return handle
+
+    def remove_listener(self, handle: int) -> None:
+        interface_name, object_path, callback, first = self._handles.pop(handle)
+        if first:
+            self._first[interface_name].remove(callback)
+        else:
+            callbacks = self._listeners[(interface_name, object_path)]
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._listeners[(interface_name, object_path)]
+
+        self._listener_counts[interface_name] -= 1
+        if not self._listener_counts[interface_name]:
+            self._bus.signal_unsubscribe(self._subscriptions.pop(interface_name))
+            del self._listener_counts[interface_name]
+            self._first.pop(interface_name, None)
+
+    def get_rates(self) -> Dict[str, float]:
+        now = time.monotonic()
+        elapsed = max(now - self._counting_since, 0.001)
+        rates = {name: count / elapsed for name, count in self._counts.items()}
+        self._counts = {}
+        self._counting_since = now
+        return rates
+
+    def _log_rates(self) -> bool:
+        rates = ", ".join(f"{name}: {rate:.2f}/s" for name, rate in sorted(self.get_rates().items()))
+        logging.debug(f"PropertiesChanged rates of {self._name}: {rates}")
+        return True
+
+    def _on_properties_changed(self, _connection: Gio.DBusConnection, _sender_name: str, object_path: str,
+                               _interface_name: str, _signal_name: str, param: GLib.Variant) -> None:
+        interface_name, changed, invalidated = param.unpack()
+        self._counts[interface_name] = self._counts.get(interface_name, 0) + 1
+
+        callbacks = self._first.get(interface_name, []) + self._listeners.get((interface_name, object_path), []) \
+            + self._listeners.get((interface_name, None), [])
+        for callback in callbacks:
+            callback(object_path, interface_name, changed, invalidated)
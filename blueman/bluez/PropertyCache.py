@@ -0,0 +1,236 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Set, Tuple, List, Iterator, Optional
+
+from gi.repository import Gio, GLib
+
+from blueman.bluemantyping import ObjectPath
+from blueman.bluez.PropertiesDispatcher import PropertiesDispatcher
+
+
+class PropertyCache:
+    """In-process copy of the properties a D-Bus service exports through its ObjectManager"""
+
+    __instances: Dict[Tuple[Gio.BusType, str], "PropertyCache"] = {}
+
+    # Removals remembered for changes_since(), older ones require a full reload by the caller
+    removed_limit = 1024
+
+    @classmethod
+    def get_instance(cls, bus_type: Gio.BusType, name: str) -> "PropertyCache":
+        key = (bus_type, name)
+        if key not in cls.__instances:
+            cls.__instances[key] = cls(bus_type, name)
+        return cls.__instances[key]
+
+    def __init__(self, bus_type: Gio.BusType, name: str) -> None:
+        self._name = name
+        self._bus = Gio.bus_get_sync(bus_type)
+        self._dispatcher = PropertiesDispatcher.get_instance(bus_type, name)
+
+        self._objects: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # (object path, interface) pairs holding every property, anything else only has what was read or signalled
+        self._complete: Set[Tuple[str, str]] = set()
+        self._interfaces: Set[str] = set()
+        self._pending: Set[str] = set()
+
+        self.hits = 0
+        self.misses = 0
+
+        # Bumped on every change, (object path, interface) pairs remember the generation they last changed in
+        self.generation = 0
+        self._changed: Dict[Tuple[str, str], int] = {}
+        self._removed: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._horizon = 0
+
+        self._subscriptions: List[int] = [
+            self._bus.signal_subscribe(name, "org.freedesktop.DBus.ObjectManager", "InterfacesAdded", None, None,
+                                       Gio.DBusSignalFlags.NONE, self._on_interfaces_added),
+            self._bus.signal_subscribe(name, "org.freedesktop.DBus.ObjectManager", "InterfacesRemoved", None, None,
+                                       Gio.DBusSignalFlags.NONE, self._on_interfaces_removed),
+            self._bus.signal_subscribe("org.freedesktop.DBus", "org.freedesktop.DBus", "NameOwnerChanged",
+                                       "/org/freedesktop/DBus", name, Gio.DBusSignalFlags.NONE,
+                                       self._on_name_owner_changed),
+        ]
+
+    def track(self, interface_name: str) -> None:
+        if interface_name in self._interfaces:
+            return
+
+        self._interfaces.add(interface_name)
+        self._pending.add(interface_name)
+        self._dispatcher.add_listener(interface_name, None, self._on_properties_changed, first=True)
+
+    def _load_pending(self) -> None:
+        # A single GetManagedObjects fills every interface tracked since the last load
+        pending = self._pending
+        self._pending = set()
+
+        try:
+            reply = self._bus.call_sync(self._name, "/", "org.freedesktop.DBus.ObjectManager", "GetManagedObjects",
+                                        None, GLib.VariantType.new("(a{oa{sa{sv}}})"), Gio.DBusCallFlags.NONE,
+                                        GLib.MAXINT, None)
+        except GLib.Error as e:
+            logging.debug(f"Could not load objects of {self._name}: {e.message}")
+            return
+
+        objects: Dict[str, Dict[str, Dict[str, Any]]] = reply.unpack()[0]
+        for object_path, interfaces in objects.items():
+            self._add(object_path, {name: props for name, props in interfaces.items() if name in pending})
+
+        logging.debug(f"Loaded {len(objects)} objects of {self._name} for {', '.join(sorted(pending))}")
+
+    def _add(self, object_path: str, interfaces: Dict[str, Dict[str, Any]]) -> None:
+        if not interfaces:
+            return
+
+        cached = self._objects.setdefault(object_path, {})
+        for interface_name, props in interfaces.items():
+            cached[interface_name] = dict(props)
+            self._complete.add((object_path, interface_name))
+            self._touch(object_path, interface_name)
+
+    def _touch(self, object_path: str, interface_name: str) -> None:
+        self.generation += 1
+        self._changed[(object_path, interface_name)] = self.generation
+        self._removed.pop((object_path, interface_name), None)
+
+    def _forget(self, object_path: str, interface_name: str) -> None:
+        self.generation += 1
+        self._complete.discard((object_path, interface_name))
+        self._changed.pop((object_path, interface_name), None)
+        self._removed[(object_path, interface_name)] = self.generation
+        if len(self._removed) > self.removed_limit:
+            _key, generation = self._removed.popitem(last=False)
+            self._horizon = generation
+
+    def get(self, object_path: ObjectPath, interface_name: str, name: str) -> Any:
+        if interface_name in self._pending:
+            self._load_pending()
+
+        try:
+            value = self._objects[object_path][interface_name][name]
+        except KeyError:
+            self.misses += 1
+            logging.debug(f"Cache miss for {object_path} {interface_name}.{name}")
+            raise
+
+        self.hits += 1
+        return value
+
+    def get_all(self, object_path: ObjectPath, interface_name: str) -> Dict[str, Any]:
+        if interface_name in self._pending:
+            self._load_pending()
+
+        if (object_path, interface_name) not in self._complete:
+            self.misses += 1
+            logging.debug(f"Stale properties for {object_path} {interface_name}")
+            raise KeyError(object_path)
+
+        self.hits += 1
+        return self._objects[object_path][interface_name]
+
+    def is_complete(self, object_path: ObjectPath, interface_name: str) -> bool:
+        # Every property of the object is held, one that is missing does not exist
+        if interface_name in self._pending:
+            self._load_pending()
+        return (object_path, interface_name) in self._complete
+
+    def store(self, object_path: ObjectPath, interface_name: str, name: str, value: Any) -> None:
+        if interface_name in self._interfaces:
+            self._objects.setdefault(object_path, {}).setdefault(interface_name, {})[name] = value
+            self._touch(object_path, interface_name)
+
+    def store_all(self, object_path: ObjectPath, interface_name: str, props: Dict[str, Any]) -> None:
+        if interface_name in self._interfaces:
+            self._add(object_path, {interface_name: props})
+
+    def load(self, object_path: ObjectPath, interface_name: str) -> Dict[str, Any]:
+        reply = self._bus.call_sync(self._name, object_path, "org.freedesktop.DBus.Properties", "GetAll",
+                                    GLib.Variant("(s)", (interface_name,)), GLib.VariantType.new("(a{sv})"),
+                                    Gio.DBusCallFlags.NONE, GLib.MAXINT, None)
+        props: Dict[str, Any] = reply.unpack()[0]
+        self.store_all(object_path, interface_name, props)
+        return props
+
+    def get_objects(self, interface_name: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if interface_name in self._pending:
+            self._load_pending()
+
+        for object_path, interfaces in list(self._objects.items()):
+            if interface_name not in interfaces:
+                continue
+
+            if (object_path, interface_name) in self._complete:
+                yield object_path, interfaces[interface_name]
+                continue
+
+            # Only some properties were read so far, the object is listed with all of them
+            try:
+                yield object_path, self.load(ObjectPath(object_path), interface_name)
+            except GLib.Error as e:
+                logging.debug(f"Could not read {object_path} {interface_name}: {e.message}")
+
+    def changes_since(self, generation: int, interface_name: str) -> Optional[Tuple[List[str], List[str]]]:
+        if interface_name in self._pending:
+            self._load_pending()
+
+        if generation < self._horizon:
+            return None
+
+        # Including objects of which only some properties were read, the caller reads those through load()
+        changed = [path for (path, name), gen in self._changed.items() if gen > generation and name == interface_name]
+        removed = [path for (path, name), gen in self._removed.items() if gen > generation and name == interface_name]
+        return changed, removed
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "objects": len(self._objects)}
+
+    def clear(self) -> None:
+        self._objects = {}
+        self._complete = set()
+        self._pending = set(self._interfaces)
+        self.generation += 1
+        self._changed = {}
+        self._removed = OrderedDict()
+        self._horizon = self.generation
+
+    def _on_interfaces_added(self, _connection: Gio.DBusConnection, _sender_name: str, _object_path: str,
+                             _interface_name: str, _signal_name: str, param: GLib.Variant) -> None:
+        object_path, interfaces = param.unpack()
+        self._add(object_path, {name: props for name, props in interfaces.items() if name in self._interfaces})
+
+    def _on_interfaces_removed(self, _connection: Gio.DBusConnection, _sender_name: str, _object_path: str,
+                               _interface_name: str, _signal_name: str, param: GLib.Variant) -> None:
+        object_path, interfaces = param.unpack()
+        cached = self._objects.get(object_path)
+        if cached is None:
+            return
+
+        for interface_name in interfaces:
+            if cached.pop(interface_name, None) is not None:
+                self._forget(object_path, interface_name)
+
+        if not cached:
+            del self._objects[object_path]
+
+    def _on_properties_changed(self, object_path: str, interface_name: str, changed: Dict[str, Any],
+                               invalidated: List[str]) -> None:
+        props = self._objects.get(object_path, {}).get(interface_name)
+        if props is None:
+            # Nothing read from this object yet, a miss will fetch current values
+            return
+
+        # BlueZ invalidates properties that no longer have a value, e.g. RSSI once discovery stopped, so they are
+        # dropped and the rest stays complete
+        props.update(changed)
+        for name in invalidated:
+            props.pop(name, None)
+
+        self._touch(object_path, interface_name)
+
+    def _on_name_owner_changed(self, _connection: Gio.DBusConnection, _sender_name: str, _object_path: str,
+                               _interface_name: str, _signal_name: str, param: GLib.Variant) -> None:
+        name, old_owner, new_owner = param.unpack()
+        logging.info(f"{name} owner changed from '{old_owner}' to '{new_owner}', dropping cached properties")
+        self.clear()
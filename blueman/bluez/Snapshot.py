@@ -0,0 +1,69 @@
+from types import MappingProxyType
+from typing import NamedTuple, Mapping, Any, Tuple
+
+from blueman.bluemantyping import ObjectPath, BtAddress
+
+
+class AdapterRecord(NamedTuple):
+    object_path: ObjectPath
+    address: BtAddress
+    alias: str
+    powered: bool
+    discovering: bool
+    properties: Mapping[str, Any]
+
+
+class DeviceRecord(NamedTuple):
+    object_path: ObjectPath
+    adapter: ObjectPath
+    address: BtAddress
+    alias: str
+    icon: str
+    klass: int
+    appearance: int
+    paired: bool
+    connected: bool
+    trusted: bool
+    blocked: bool
+    properties: Mapping[str, Any]
+
+
+class BatteryRecord(NamedTuple):
+    object_path: ObjectPath
+    percentage: int
+    properties: Mapping[str, Any]
+
+
+class Snapshot(NamedTuple):
+    generation: int
+    adapters: Tuple[AdapterRecord, ...]
+    devices: Tuple[DeviceRecord, ...]
+    batteries: Tuple[BatteryRecord, ...]
+
+
+class Delta(NamedTuple):
+    generation: int
+    # Records of objects added or changed since the requested generation
+    adapters: Tuple[AdapterRecord, ...]
+    devices: Tuple[DeviceRecord, ...]
+    batteries: Tuple[BatteryRecord, ...]
+    removed_adapters: Tuple[ObjectPath, ...]
+    removed_devices: Tuple[ObjectPath, ...]
+    removed_batteries: Tuple[ObjectPath, ...]
+
+
+def adapter_record(object_path: str, props: Mapping[str, Any]) -> AdapterRecord:
+    return AdapterRecord(ObjectPath(object_path), props.get("Address", ""), props.get("Alias", ""),
+                         props.get("Powered", False), props.get("Discovering", False),
+                         MappingProxyType(dict(props)))
+
+
+def device_record(object_path: str, props: Mapping[str, Any]) -> DeviceRecord:
+    return DeviceRecord(ObjectPath(object_path), props.get("Adapter", ObjectPath("/")), props.get("Address", ""),
+                        props.get("Alias", ""), props.get("Icon", "blueman"), props.get("Class", 0),
+                        props.get("Appearance", 0), props.get("Paired", False), props.get("Connected", False),
+                        props.get("Trusted", False), props.get("Blocked", False), MappingProxyType(dict(props)))
+
+
+def battery_record(object_path: str, props: Mapping[str, Any]) -> BatteryRecord:
+    return BatteryRecord(ObjectPath(object_path), props.get("Percentage", 0), MappingProxyType(dict(props)))
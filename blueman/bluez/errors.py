@@ -1,4 +1,4 @@
-from gi.repository import GLib
+from gi.repository import GLib, Gio
 
 
 class BluezDBusException(Exception):
@@ -101,6 +101,14 @@ class BluezUnavailableAgentMethodError(BluezDBusException):
     pass
 
 
+class DBusCancelledError(BluezDBusException):
+    pass
+
+
+class DBusTimeoutError(BluezDBusException):
+    pass
+
+
 __DICT_ERROR__ = {'org.bluez.Error.Failed': DBusFailedError,
                   'org.bluez.Error.InvalidArguments': DBusInvalidArgumentsError,
                   'org.bluez.Error.NotAuthorized': DBusNotAuthorizedError,
@@ -121,12 +129,22 @@ __DICT_ERROR__ = {'org.bluez.Error.Failed': DBusFailedError,
                   'org.bluez.Error.AuthenticationCanceled': DBusAuthenticationCanceledError,
                   'org.bluez.serial.Error.NotSupported': DBusNotSupportedError,
                   'org.bluez.Error.UnsupportedMajorClass': DBusUnsupportedMajorClassError,
-                  'org.freedesktop.DBus.Error.ServiceUnknown': DBusServiceUnknownError}
+                  'org.freedesktop.DBus.Error.ServiceUnknown': DBusServiceUnknownError,
+                  'org.freedesktop.DBus.Error.NoReply': DBusTimeoutError,
+                  'org.freedesktop.DBus.Error.Timeout': DBusTimeoutError}
 
 
 def parse_dbus_error(exception: GLib.Error) -> BluezDBusException:
     global __DICT_ERROR__
 
+    # Errors raised locally by GIO carry no D-Bus error name
+    if exception.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+        return DBusCancelledError(exception.message)
+    elif exception.matches(Gio.io_error_quark(), Gio.IOErrorEnum.TIMED_OUT):
+        return DBusTimeoutError(exception.message)
+    elif not Gio.DBusError.is_remote_error(exception):
+        return BluezDBusException(exception.message)
+
     gerror, dbus_error, message = exception.message.split(':', 2)
     try:
         return __DICT_ERROR__[dbus_error](message)
@@ -71,6 +71,8 @@ class Manager(GObject.GObject, metaclass=SingletonGObjectMeta):
             for handlerid in handlerids:
                 transfer.disconnect_signal(handlerid)
 
+            Transfer.evict(object_path)
+
         if session_proxy:
             logging.info(object_path)
             self.emit('session-removed', object_path)
@@ -1,9 +1,9 @@
 import logging
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from blueman.bluemantyping import ObjectPath
 
 from blueman.bluez.obex.Base import Base
-from gi.repository import GObject, Gio, GLib
+from gi.repository import GObject
 
 from blueman.bluemantyping import GSignals
 
@@ -40,10 +40,9 @@ class Transfer(Base):
         size: Optional[int] = self.get("Size")
         return size
 
-    def _properties_changed(self, _proxy: Gio.DBusProxy, changed_properties: GLib.Variant,
-                            _invalidated_properties: List[str]) -> None:
-        logging.debug(f"{changed_properties}")
-        for name, value in changed_properties.unpack().items():
+    def _properties_changed(self, changed: Dict[str, Any], _invalidated_properties: List[str]) -> None:
+        logging.debug(f"{changed}")
+        for name, value in changed.items():
             logging.debug(f"{self.get_object_path()} {name} {value}")
             if name == 'Transferred':
                 self.emit('progress', value)
@@ -1,6 +1,8 @@
+from collections import deque, OrderedDict
 from datetime import datetime
 import logging
-from typing import Dict, List, Optional, Any, Callable
+import time
+from typing import Dict, List, Optional, Any, Callable, Deque, NamedTuple
 
 from blueman.Functions import adapter_path_to_name
 from blueman.gui.GenericList import GenericList, ListDataDict
@@ -18,7 +20,15 @@ import gi
 from blueman.bluemantyping import GSignals, ObjectPath
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+gi.require_version("Gdk", "3.0")
+from gi.repository import Gtk, Gdk
+
+
+class _CachedRows(NamedTuple):
+    liststore: Gtk.ListStore
+    path_to_row: Dict[str, Gtk.TreeRowReference]
+    # Manager generation the rows were current at
+    generation: int
 
 
 class DeviceList(GenericList):
@@ -41,6 +51,22 @@ class DeviceList(GenericList):
         'adapter-removed': (GObject.SignalFlags.RUN_LAST, None, (str,)),
     }
 
+    # Advertisement driven properties, rows see at most one update per interval for each of them
+    throttled_properties = ("RSSI", "TxPower", "ManufacturerData", "ServiceData")
+    throttle_interval = 500
+
+    # populate_devices() adds this many rows at once, the rest in idle time slices of populate_slice seconds
+    populate_first_rows = 50
+    populate_slice = 0.01
+
+    # Larger lists are cleared without a device_remove_event (and removal animation) per row
+    clear_event_limit = 30
+
+    # Rows of up to this many adapters switched away from are kept, as long as they have no more than
+    # adapter_cache_rows rows together, the least recently shown are dropped first
+    adapter_cache_size = 0
+    adapter_cache_rows = 1000
+
     def __init__(self, adapter_name: Optional[str] = None, tabledata: Optional[List[ListDataDict]] = None,
                  headers_visible: bool = True) -> None:
         if not tabledata:
@@ -61,10 +87,17 @@ class DeviceList(GenericList):
                                                                  'device-removed'))
 
         self.any_device = AnyDevice()
-        self._anydevhandler = self.any_device.connect_signal("property-changed", self._on_device_property_changed)
+        for key in self.throttled_properties:
+            self.any_device.set_throttle(key, self.throttle_interval)
+        self._anydevhandler = self.any_device.connect_signal("properties-changed", self._on_device_properties_changed)
 
         self.__discovery_time: float = 0
+        self.__populate_source: Optional[int] = None
+        self.__populate_started = 0.0
+        self.populate_stats: Dict[str, float] = {}
         self.__adapter_path: Optional[ObjectPath] = None
+        # adapter path -> rows put aside when switching to another adapter, least recently shown first
+        self.__cached_rows: "OrderedDict[ObjectPath, _CachedRows]" = OrderedDict()
         self.Adapter: Optional[Adapter] = None
         self.discovering = False
 
@@ -90,6 +123,7 @@ class DeviceList(GenericList):
         self.icon_theme.connect("changed", self.on_icon_theme_changed)
 
     def destroy(self) -> None:
+        self.drop_cached_rows()
         self.any_device.disconnect(self._anydevhandler)
         self._any_adapter.disconnect(self._anyadapterhandler)
         self.selection.disconnect(self._selectionhandler)
@@ -100,6 +134,9 @@ class DeviceList(GenericList):
     def __on_manager_signal(self, _manager: Manager, path: ObjectPath, signal_name: str) -> None:
         if signal_name == 'adapter-removed':
             self.emit("adapter-removed", path)
+            cached = self.__cached_rows.pop(path, None)
+            if cached is not None:
+                self.rows_drop_event(cached.liststore)
             if path == self.__adapter_path:
                 self.clear()
                 self.Adapter = None
@@ -134,14 +171,15 @@ class DeviceList(GenericList):
 
         self.emit("adapter-property-changed", self.Adapter, (key, value))
 
-    def _on_device_property_changed(self, _device: AnyDevice, key: str, value: object, path: ObjectPath) -> None:
+    def _on_device_properties_changed(self, _device: AnyDevice, path: ObjectPath, changed: Dict[str, Any]) -> None:
         tree_iter = self.find_device_by_path(path)
 
         if tree_iter is not None:
-            dev = self.get(tree_iter, "device")["device"]
-            self.row_update_event(tree_iter, key, value)
+            dev = self.get_value(tree_iter, "device")
+            for key, value in changed.items():
+                self.row_update_event(tree_iter, key, value)
 
-            self.emit("device-property-changed", dev, tree_iter, (key, value))
+                self.emit("device-property-changed", dev, tree_iter, (key, value))
 
     # Override when subclassing
     def on_icon_theme_changed(self, _icon_them: Gtk.IconTheme) -> None:
@@ -157,6 +195,22 @@ class DeviceList(GenericList):
     def row_update_event(self, tree_iter: Gtk.TreeIter, key: str, value: Any) -> None:
         pass
 
+    # called instead of device_remove_event for each row when clear() drops more than clear_event_limit rows at once
+    def rows_clear_event(self) -> None:
+        pass
+
+    # called before the rows of the current adapter are put aside for switching back to it
+    def rows_hide_event(self) -> None:
+        pass
+
+    # called after rows put aside are shown again, before they are brought up to date
+    def rows_show_event(self) -> None:
+        pass
+
+    # called when rows put aside are dropped
+    def rows_drop_event(self, liststore: Gtk.ListStore) -> None:
+        pass
+
     # called when device needs to be added to the list
     def device_add_event(self, object_path: ObjectPath) -> None:
         self.add_device(object_path)
@@ -176,7 +230,11 @@ class DeviceList(GenericList):
     #########################
 
     def set_adapter(self, adapter: Optional[str] = None) -> None:
-        self.clear()
+        if self.__populate_source is None and self.__adapter_path is not None and self.adapter_cache_size > 0 \
+                and len(self.liststore):
+            self._cache_rows(self.__adapter_path)
+        else:
+            self.clear()
         if self.discovering:
             self.stop_discovery()
             self.emit("adapter-property-changed", self.Adapter, ("Discovering", False))
@@ -220,7 +278,10 @@ class DeviceList(GenericList):
         self.emit("discovery-progress", progress)
         return True
 
-    def add_device(self, object_path: ObjectPath) -> None:
+    def add_device(self, object_path: ObjectPath, select: bool = True) -> None:
+        if object_path in self.path_to_row:
+            return
+
         device = Device(obj_path=object_path)
         # device belongs to another adapter
         if not self.Adapter or not device['Adapter'] == self.Adapter.get_object_path():
@@ -238,23 +299,159 @@ class DeviceList(GenericList):
         tree_iter = self.append(**colls)
         self.row_setup_event(tree_iter, device)
 
-        if self.get_selected_device() is None:
+        if select and self.get_selected_device() is None:
             self.selection.select_path(Gtk.TreePath.new_first())
 
     def populate_devices(self) -> None:
         self.clear()
-        self.manager.populate_devices()
+        if self.Adapter is None:
+            return
+
+        adapter_path = self.Adapter.get_object_path()
+        if self._restore_rows(adapter_path):
+            return
+
+        pending = deque(record.object_path for record in self.manager.snapshot().devices
+                        if record.adapter == adapter_path)
+
+        self.__populate_started = time.monotonic()
+        self.populate_stats = {"rows": len(pending)}
+        self._suspend_sort()
+
+        # The first rows are added detached so they are not laid out or drawn one by one, later chunks go into the
+        # attached model to keep the selection and scroll position the user may have by then
+        self.set_model(None)
+        self._populate_chunk(pending, self.populate_first_rows)
+        self.set_model(self.filter)
+        if self.get_selected_device() is None and len(self.liststore):
+            self.selection.select_path(Gtk.TreePath.new_first())
+
+        self.populate_stats["first_rows"] = time.monotonic() - self.__populate_started
+        frame_clock = self.get_frame_clock()
+        if frame_clock is not None:
+            def on_after_paint(clock: Gdk.FrameClock) -> None:
+                self._on_first_paint(clock, handler)
+
+            handler = frame_clock.connect("after-paint", on_after_paint)
+
+        if pending:
+            self.__populate_source = GLib.idle_add(lambda: self._populate_chunk(pending, None),
+                                                   priority=GLib.PRIORITY_DEFAULT_IDLE)
+        else:
+            self._finish_populating()
+
+        self.manager.populate_batteries(adapter_path)
+
+    def _populate_chunk(self, pending: Deque[ObjectPath], rows: Optional[int]) -> bool:
+        deadline = time.monotonic() + self.populate_slice
+        added = 0
+        while pending:
+            self.add_device(pending.popleft(), select=False)
+            added += 1
+            if (rows is None and time.monotonic() >= deadline) or (rows is not None and added >= rows):
+                break
+
+        if rows is None and not pending:
+            self.__populate_source = None
+            self._finish_populating()
+            return False
+        return True
+
+    def _finish_populating(self) -> None:
+        self._resume_sort()
+
+        self.populate_stats["complete"] = time.monotonic() - self.__populate_started
+        logging.debug(f"Populated {self.populate_stats}")
+
+    def _on_first_paint(self, frame_clock: Gdk.FrameClock, handler: int) -> None:
+        frame_clock.disconnect(handler)
+        self.populate_stats["first_paint"] = time.monotonic() - self.__populate_started
+
+    def _cache_rows(self, adapter_path: ObjectPath) -> None:
+        self.rows_hide_event()
+        self.__cached_rows[adapter_path] = _CachedRows(self.liststore, self.path_to_row, self.manager.generation)
+        self.__cached_rows.move_to_end(adapter_path)
+
+        self._set_store(self._new_store())
+        self.path_to_row = {}
+        self.emit("device-selected", None, None)
+        self.evict_cached_rows()
+
+    def _restore_rows(self, adapter_path: ObjectPath) -> bool:
+        cached = self.__cached_rows.pop(adapter_path, None)
+        if cached is None:
+            return False
+
+        delta = self.manager.since(cached.generation)
+        if delta is None:
+            self.rows_drop_event(cached.liststore)
+            return False
+
+        self._set_store(cached.liststore)
+        self.path_to_row = cached.path_to_row
+        self.rows_show_event()
+
+        # Only what changed while the rows were put aside is redone
+        with self.batch():
+            for object_path in delta.removed_devices:
+                tree_iter = self.find_device_by_path(object_path)
+                if tree_iter is not None:
+                    self.delete(tree_iter)
+                    del self.path_to_row[object_path]
+
+            for record in delta.devices:
+                if record.adapter != adapter_path:
+                    continue
+                tree_iter = self.find_device_by_path(record.object_path)
+                if tree_iter is None:
+                    self.add_device(record.object_path, select=False)
+                else:
+                    device = self.get_value(tree_iter, "device")
+                    self.set(tree_iter, no_name="Name" not in device)
+                    self.row_setup_event(tree_iter, device)
+
+        logging.debug(f"Restored {len(self.liststore)} rows of {adapter_path}, {len(delta.devices)} devices changed")
+        if self.get_selected_device() is None and len(self.liststore):
+            self.selection.select_path(Gtk.TreePath.new_first())
+        return True
+
+    def evict_cached_rows(self) -> None:
+        rows = sum(len(cached.liststore) for cached in self.__cached_rows.values())
+        while self.__cached_rows and (len(self.__cached_rows) > self.adapter_cache_size or
+                                      rows > self.adapter_cache_rows):
+            adapter_path, cached = self.__cached_rows.popitem(last=False)
+            rows -= len(cached.liststore)
+            logging.debug(f"Dropping {len(cached.liststore)} cached rows of {adapter_path}")
+            self.rows_drop_event(cached.liststore)
+
+    def drop_cached_rows(self) -> None:
+        while self.__cached_rows:
+            _adapter_path, cached = self.__cached_rows.popitem()
+            self.rows_drop_event(cached.liststore)
+
+    def _stop_populating(self) -> None:
+        if self.__populate_source is not None:
+            GLib.source_remove(self.__populate_source)
+            self.__populate_source = None
+            self._finish_populating()
 
     def discover_devices(self, time: float = 60.0,
-                         error_handler: Optional[Callable[[BluezDBusException], None]] = None) -> None:
+                         error_handler: Optional[Callable[[BluezDBusException], None]] = None,
+                         discovery_filter: Optional[Dict[str, Any]] = None) -> None:
         if not self.discovering:
             self.__discovery_time = 0
             if self.Adapter is not None:
+                if discovery_filter is not None:
+                    # Queued before StartDiscovery on the same connection, so it applies to this search already
+                    self.Adapter.set_discovery_filter(discovery_filter, error_handler=self._on_discovery_filter_error)
                 self.Adapter.start_discovery(error_handler=error_handler)
                 self.discovering = True
                 t = 1.0 / 15 * 1000
                 GLib.timeout_add(int(t), self.update_progress, t / 1000, time)
 
+    def _on_discovery_filter_error(self, error: BluezDBusException) -> None:
+        logging.warning(f"Discovery filter not applied: {error}")
+
     def is_valid_adapter(self) -> bool:
         if self.Adapter is None:
             return False
@@ -278,12 +475,20 @@ class DeviceList(GenericList):
         return None
 
     def clear(self) -> None:
+        self._stop_populating()
         if len(self.liststore):
-            for i in self.liststore:
-                tree_iter = i.iter
-                dbus_path = self.get(tree_iter, "dbus_path")["dbus_path"]
-                self.device_remove_event(dbus_path)
-            self.liststore.clear()
+            if len(self.liststore) > self.clear_event_limit:
+                self.rows_clear_event()
+                # The view would otherwise handle each deleted row
+                self.set_model(None)
+                self.liststore.clear()
+                self.set_model(self.filter)
+            else:
+                for i in self.liststore:
+                    tree_iter = i.iter
+                    dbus_path = self.get(tree_iter, "dbus_path")["dbus_path"]
+                    self.device_remove_event(dbus_path)
+                self.liststore.clear()
             self.emit("device-selected", None, None)
 
         self.path_to_row = {}
@@ -334,4 +539,6 @@ class DeviceList(GenericList):
 
     def set(self, tree_iter: Gtk.TreeIter, **kwargs: object) -> None:
         super().set(tree_iter, **kwargs)
-        self.do_cache(tree_iter, kwargs)
+        # Row references are made on insert, only a row that changes its device needs a new one
+        if "device" in kwargs or "dbus_path" in kwargs:
+            self.do_cache(tree_iter, kwargs)
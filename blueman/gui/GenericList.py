@@ -1,4 +1,5 @@
-from typing import Dict, Optional, TYPE_CHECKING, Iterable, Mapping, Callable, Tuple, Collection, Any
+from contextlib import contextmanager
+from typing import Dict, Optional, TYPE_CHECKING, Iterable, Mapping, Callable, Tuple, Collection, Any, Iterator
 
 import gi
 gi.require_version("Gtk", "3.0")
@@ -24,21 +25,29 @@ else:
 
 # noinspection PyAttributeOutsideInit
 class GenericList(Gtk.TreeView):
+    liststore: Gtk.ListStore
+    filter: Gtk.TreeModelFilter
+
     def __init__(self, data: Iterable[ListDataDict], headers_visible: bool = True, visible: bool = False) -> None:
         super().__init__(headers_visible=headers_visible, visible=visible)
         self.set_name("GenericList")
         self.selection = self.get_selection()
+
+        self.__batch_depth = 0
+        self.__sort_suspended = 0
+        self.__sort: Optional[Tuple[int, Gtk.SortType]] = None
+        self.__visible_func: Optional[Callable[[Gtk.TreeModel, Gtk.TreeIter, Any], bool]] = None
+
         self._load(data)
 
     def _load(self, data: Iterable[ListDataDict]) -> None:
         self.ids: Dict[str, int] = {}
         self.columns: Dict[str, Gtk.TreeViewColumn] = {}
 
-        types = [row["type"] for row in data]
-
-        self.liststore = Gtk.ListStore(*types)
-        self.filter = self.liststore.filter_new()
-        self.set_model(self.filter)
+        self.__types = [row["type"] for row in data]
+        # column names -> column indices, per distinct set of names read
+        self.__indices: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+        self._set_store(self._new_store())
 
         for i, row in enumerate(data):
             self.ids[row["id"]] = i
@@ -60,6 +69,23 @@ class GenericList(Gtk.TreeView):
             self.columns[row["id"]] = column
             self.append_column(column)
 
+    def _new_store(self) -> Gtk.ListStore:
+        return Gtk.ListStore(*self.__types)
+
+    def _set_store(self, liststore: Gtk.ListStore) -> None:
+        """Shows the rows of another store made by _new_store, with the sorting and filter of the current one"""
+        if hasattr(self, "liststore"):
+            sort_column_id, order = self.liststore.get_sort_column_id()
+            if sort_column_id is not None and order is not None:
+                liststore.set_sort_column_id(sort_column_id, order)
+
+        self.liststore = liststore
+        self.__get_value = liststore.get_value
+        self.filter = liststore.filter_new()
+        if self.__visible_func is not None:
+            self.filter.set_visible_func(self.__filter_visible)
+        self.set_model(self.filter)
+
     def selected(self) -> Optional[Gtk.TreeIter]:
         model, tree_iter = self.selection.get_selected()
         if tree_iter is not None:
@@ -95,19 +121,67 @@ class GenericList(Gtk.TreeView):
         return self.liststore.prepend(vals)
 
     def set(self, tree_iter: Gtk.TreeIter, **cols: object) -> None:
-        for k, v in cols.items():
-            self.liststore.set(tree_iter, self.ids[k], v)
+        # A single change notification for all columns
+        if cols:
+            self.liststore.set(tree_iter, [self.ids[k] for k in cols], list(cols.values()))
+
+    def set_visible_func(self, func: Callable[[Gtk.TreeModel, Gtk.TreeIter, Any], bool]) -> None:
+        self.__visible_func = func
+        self.filter.set_visible_func(self.__filter_visible)
+
+    def __filter_visible(self, model: Gtk.TreeModel, tree_iter: Gtk.TreeIter, data: Any) -> bool:
+        # Everything passes during a batch, the filter runs once over all rows when it ends
+        if self.__batch_depth or self.__visible_func is None:
+            return True
+        return self.__visible_func(model, tree_iter, data)
+
+    def _suspend_sort(self) -> None:
+        if not self.__sort_suspended:
+            sort_column_id, order = self.liststore.get_sort_column_id()
+            self.__sort = None if sort_column_id is None or order is None else (sort_column_id, order)
+            self.liststore.set_sort_column_id(Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID, Gtk.SortType.ASCENDING)
+        self.__sort_suspended += 1
+
+    def _resume_sort(self) -> None:
+        self.__sort_suspended -= 1
+        if not self.__sort_suspended:
+            if self.__sort is not None:
+                self.liststore.set_sort_column_id(*self.__sort)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Suspends sorting and filtering for the changes made within, rows are sorted and filtered once after"""
+        self._suspend_sort()
+        self.__batch_depth += 1
+        try:
+            yield
+        finally:
+            self.__batch_depth -= 1
+            self._resume_sort()
+            if not self.__batch_depth:
+                self.filter.refilter()
+
+    def __column_indices(self, items: Tuple[str, ...]) -> Tuple[int, ...]:
+        indices = self.__indices.get(items)
+        if indices is None:
+            indices = self.__indices[items] = tuple(self.ids[name] for name in items)
+        return indices
+
+    def get_value(self, tree_iter: Gtk.TreeIter, item: str) -> Any:
+        return self.__get_value(tree_iter, self.ids[item])
+
+    def get_values(self, tree_iter: Gtk.TreeIter, *items: str) -> Tuple[Any, ...]:
+        """Values of the given columns in the given order, without building a dictionary"""
+        get_value = self.__get_value
+        return tuple([get_value(tree_iter, i) for i in self.__column_indices(items)])
 
     def get(self, tree_iter: Gtk.TreeIter, *items: str) -> Dict[str, Any]:
-        row_data = {}
         if not items:
-            columns = [(name, self.ids[name]) for name in self.ids]
+            items = tuple(self.ids)
         else:
-            columns = [(name, self.ids[name]) for name in items if name in self.ids]
+            items = tuple(name for name in items if name in self.ids)
 
-        for name, colid in columns:
-            row_data[name] = self.liststore.get_value(tree_iter, colid)
-        return row_data
+        return dict(zip(items, self.get_values(tree_iter, *items)))
 
     def get_iter(self, path: Optional[Gtk.TreePath]) -> Optional[Gtk.TreeIter]:
         if path is None:
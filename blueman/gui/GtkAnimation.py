@@ -1,3 +1,6 @@
+import logging
+import time
+import weakref
 from typing import List, Optional, Collection, Iterable, TYPE_CHECKING
 
 import cairo
@@ -18,40 +21,141 @@ if TYPE_CHECKING:
     BaseContext = cairo.Context[cairo.Surface]
 
 
+class Animator:
+    """Steps all running animations of a widget from its frame clock, it only ticks while one is running"""
+
+    __animators: "weakref.WeakKeyDictionary[Gtk.Widget, Animator]" = weakref.WeakKeyDictionary()
+
+    stats_interval = 5.0
+
+    # Milliseconds past the end of the last animation after which all of them are finished without frames, the
+    # widget may have stopped getting them without being unmapped, e.g. in a minimized window
+    finish_grace = 500
+
+    @classmethod
+    def get_instance(cls, widget: Gtk.Widget) -> "Animator":
+        animator = cls.__animators.get(widget)
+        if animator is None:
+            animator = cls.__animators[widget] = cls(widget)
+        return animator
+
+    def __init__(self, widget: Gtk.Widget) -> None:
+        self._widget = weakref.ref(widget)
+        self._animations: List["AnimBase"] = []
+        self._tick: Optional[int] = None
+        self._deadline: Optional[int] = None
+        self._finish_by = 0.0
+
+        self._frames = 0
+        self._steps = 0
+        self._counting_since = time.monotonic()
+
+        # After the default handler, so the widget no longer counts as mapped for animations started on finish
+        widget.connect_after("unmap", self._on_unmap)
+
+    def add(self, animation: "AnimBase") -> bool:
+        widget = self._widget()
+        # Unmapped widgets get no frames
+        if widget is None or not widget.get_mapped():
+            return False
+
+        if animation not in self._animations:
+            self._animations.append(animation)
+        if self._tick is None:
+            self._tick = widget.add_tick_callback(self._on_tick)
+
+        # A single deadline for all animations, moved on when it fires before the last of them should have ended
+        self._finish_by = max(self._finish_by, time.monotonic() + (animation._duration + self.finish_grace) / 1000)
+        if self._deadline is None:
+            self._deadline = GLib.timeout_add(animation._duration + self.finish_grace, self._on_deadline)
+        return True
+
+    def remove(self, animation: "AnimBase") -> None:
+        if animation in self._animations:
+            self._animations.remove(animation)
+        if not self._animations:
+            self._remove_deadline()
+
+    def finish_all(self) -> None:
+        # Animations started again by a handler of animation-finished are left running
+        for animation in list(self._animations):
+            animation.finish()
+
+    def _on_unmap(self, _widget: Gtk.Widget) -> None:
+        self.finish_all()
+
+    def _on_deadline(self) -> bool:
+        remaining = int((self._finish_by - time.monotonic()) * 1000)
+        if remaining > 0:
+            self._deadline = GLib.timeout_add(remaining, self._on_deadline)
+            return False
+
+        self._deadline = None
+        self._finish_by = 0.0
+        logging.debug(f"{self._widget()} got no frames, finishing {len(self._animations)} animations")
+        self.finish_all()
+        return False
+
+    def _remove_deadline(self) -> None:
+        if self._deadline is not None:
+            GLib.source_remove(self._deadline)
+            self._deadline = None
+        self._finish_by = 0.0
+
+    def _on_tick(self, _widget: Gtk.Widget, frame_clock: Gdk.FrameClock, _data: Optional[object] = None) -> bool:
+        now = frame_clock.get_frame_time() / 1000
+        for animation in list(self._animations):
+            # A handler of animation-finished may have started it again
+            if not animation._step(now) and not animation.is_animating():
+                self.remove(animation)
+
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            self._count(len(self._animations))
+
+        if not self._animations:
+            self._tick = None
+            return False
+        return True
+
+    def _count(self, steps: int) -> None:
+        self._frames += 1
+        self._steps += steps
+        elapsed = time.monotonic() - self._counting_since
+        if elapsed >= self.stats_interval:
+            logging.debug(f"{self._widget()}: {self._frames / elapsed:.1f} frames/s, "
+                          f"{self._steps / elapsed:.1f} animation steps/s")
+            self._frames = self._steps = 0
+            self._counting_since = time.monotonic()
+
+
 class AnimBase(GObject.GObject):
     __gsignals__: GSignals = {
         'animation-finished': (GObject.SignalFlags.RUN_LAST, None, ()),
     }
 
-    def __init__(self, state: float = 1.0) -> None:
+    def __init__(self, state: float = 1.0, widget: Optional[Gtk.Widget] = None) -> None:
         super().__init__()
-        self._source: Optional[int] = None
+        self._animator = None if widget is None else Animator.get_instance(widget)
+        self._running = False
+        self._began: Optional[float] = None
         self._state = state
         self.frozen = False
-        self.fps = 24.0
 
-    def _do_transition(self) -> bool:
-        if abs(self._end - self._start) < 0.000001:
+    def _step(self, now: float) -> bool:
+        if not self._running:
             return False
 
-        self._state += self._step_size
-
-        if self._end - self._start < 0:
-            if self._state <= self._end:
-                self._state = self._end
-                self._state_changed(self._state)
-                self._source = None
-                self.emit("animation-finished")
-                return False
-        else:
-            if self._state >= self._end:
-                self._state = self._end
-                self._state_changed(self._state)
-                self._source = None
-                self.emit("animation-finished")
-                return False
+        if self._began is None:
+            self._began = now
 
+        progress = min((now - self._began) / self._duration, 1.0)
+        self._state = self._start + (self._end - self._start) * progress
         self._state_changed(self._state)
+
+        if progress >= 1.0:
+            self._running = False
+            self.emit("animation-finished")
+            return False
         return True
 
     def thaw(self) -> None:
@@ -69,19 +173,33 @@ class AnimBase(GObject.GObject):
         self._start = start
         self._end = end
         self._duration = duration
+        self._began = None
+        self._running = True
 
-        if self._source:
-            GLib.source_remove(self._source)
-
-        try:
-            self._step_size = (end - start) / (self.fps * (duration / 1000.0))
-        except ZeroDivisionError:
+        if duration <= 0 or self._animator is None or not self._animator.add(self):
+            # Nothing would be shown, go straight to the end
+            self._running = False
             self._state = end
-
+            self._state_changed(end)
+            self.emit("animation-finished")
             return
 
         self._state_changed(self._state)
-        self._source = GLib.timeout_add(int(1.0 / self.fps * 1000), self._do_transition)
+
+    def stop(self) -> None:
+        # Ends a running animation where it is, without animation-finished
+        if self._running:
+            self._running = False
+            if self._animator is not None:
+                self._animator.remove(self)
+
+    def finish(self) -> None:
+        # Ends a running animation at its end state, with animation-finished
+        if self._running:
+            self.stop()
+            self._state = self._end
+            self._state_changed(self._end)
+            self.emit("animation-finished")
 
     def _state_changed(self, state: float) -> None:
         self.state_changed(state)
@@ -97,14 +215,38 @@ class AnimBase(GObject.GObject):
         self._state_changed(state)
 
     def is_animating(self) -> bool:
-        return self._source is not None
+        return self._running
+
+
+def _queue_draw_row(tw: "ManagerDeviceList", row: Gtk.TreeRowReference,
+                    columns: Iterable[Optional[Gtk.TreeViewColumn]]) -> None:
+    # Invalidates the part of the row covered by columns, the whole row if there are none
+    path = row.get_path() if row.valid() else None
+    if path is None:
+        return
+
+    path = tw.filter.convert_child_path_to_path(path)
+    if path is None:
+        return
+
+    rects = [tw.get_background_area(path, col) for col in columns if col is not None]
+    if not rects:
+        rect = tw.get_background_area(path, None)
+        _x, y = tw.convert_bin_window_to_widget_coords(0, rect.y)
+        tw.queue_draw_area(0, y, tw.get_allocated_width(), rect.height)
+        return
+
+    left = min(rect.x for rect in rects)
+    right = max(rect.x + rect.width for rect in rects)
+    x, y = tw.convert_bin_window_to_widget_coords(left, rects[0].y)
+    tw.queue_draw_area(x, y, right - left, rects[0].height)
 
 
 class TreeRowFade(AnimBase):
     def __init__(self, tw: "ManagerDeviceList",
                  path: Gtk.TreePath,
                  columns: Optional[Collection[Gtk.TreeViewColumn]] = None) -> None:
-        super().__init__(1.0)
+        super().__init__(1.0, tw)
         self.tw = tw
         assert self.tw.liststore is not None
 
@@ -156,12 +298,12 @@ class TreeRowFade(AnimBase):
         return False
 
     def state_changed(self, state: float) -> None:
-        self.tw.queue_draw()
+        _queue_draw_row(self.tw, self.row, self.columns or [])
 
 
 class CellFade(AnimBase):
     def __init__(self, tw: "ManagerDeviceList", path: Gtk.TreePath, columns: Iterable[int]) -> None:
-        super().__init__(1.0)
+        super().__init__(1.0, tw)
         self.tw = tw
         assert self.tw.liststore is not None
 
@@ -227,12 +369,12 @@ class CellFade(AnimBase):
         return False
 
     def state_changed(self, state: float) -> None:
-        self.tw.queue_draw()
+        _queue_draw_row(self.tw, self.row, self.columns)
 
 
 class WidgetFade(AnimBase):
     def __init__(self, widget: Gtk.Widget, color: Gdk.RGBA) -> None:
-        super().__init__(1.0)
+        super().__init__(1.0, widget)
 
         self.widget = widget
         self.color = color
@@ -16,7 +16,7 @@ OPACITY_START = 0.7
 
 class Fade(AnimBase):
     def __init__(self, window: Gtk.Window) -> None:
-        super().__init__(state=OPACITY_START)
+        super().__init__(state=OPACITY_START, widget=window)
         self.window = window
 
     def state_changed(self, state: float) -> None:
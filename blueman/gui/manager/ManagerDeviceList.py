@@ -1,5 +1,6 @@
+from collections import OrderedDict
 from gettext import gettext as _
-from typing import Optional, TYPE_CHECKING, List, Any, cast, Callable, Set, Dict
+from typing import Optional, TYPE_CHECKING, List, Any, cast, Callable, Dict, Tuple
 import html
 import logging
 import cairo
@@ -18,7 +19,7 @@ from blueman.Constants import PIXMAP_PATH
 from blueman.Functions import launch
 from blueman.Sdp import ServiceUUID, OBEX_OBJPUSH_SVCLASS_ID
 from blueman.gui.GtkAnimation import TreeRowFade, CellFade, AnimBase
-from _blueman import ConnInfoReadError, conn_info
+from _blueman import PowerLevelSampler
 
 import gi
 gi.require_version("Gtk", "3.0")
@@ -34,6 +35,10 @@ if TYPE_CHECKING:
     from blueman.main.Manager import Blueman
 
 
+# (rssi, tpl, max_tpl, le) as read by PowerLevelSampler
+PowerLevels = Optional[Tuple[Optional[int], Optional[int], Optional[int], bool]]
+
+
 class SurfaceObject(GObject.Object):
     __gtype_name__ = "SurfaceObject"
 
@@ -43,7 +48,16 @@ class SurfaceObject(GObject.Object):
 
 
 class ManagerDeviceList(DeviceList):
+    # Composited device icons kept, one per combination of icon, emblems and scale factor in use
+    icon_cache_size = 64
+
     def __init__(self, inst: "Blueman", adapter: Optional[str] = None) -> None:
+        self._icon_cache: "OrderedDict[Tuple[str, bool, bool, bool, bool, int], SurfaceObject]" = OrderedDict()
+        self._icon_cache_hits = 0
+        self._icon_cache_misses = 0
+        # scale factor -> (name, level) -> surface of every level image
+        self._level_surfaces: Dict[int, Dict[Tuple[str, int], cairo.ImageSurface]] = {}
+
         cr = Gtk.CellRendererText()
         cr.props.ellipsize = Pango.EllipsizeMode.END
         tabledata: List[ListDataDict] = [
@@ -52,14 +66,16 @@ class ManagerDeviceList(DeviceList):
              "render_attrs": {}, "celldata_func": (self._set_cell_data, None)},
             # device caption
             {"id": "caption", "type": str, "renderer": cr,
-             "render_attrs": {"markup": 1}, "view_props": {"expand": True}},
-            {"id": "battery_pb", "type": GdkPixbuf.Pixbuf, "renderer": Gtk.CellRendererPixbuf(),
+             "render_attrs": {}, "view_props": {"expand": True},
+             "celldata_func": (self._set_cell_data, "caption")},
+            # rounded level shown, 0 for none
+            {"id": "battery_level", "type": int, "renderer": Gtk.CellRendererPixbuf(),
              "render_attrs": {}, "view_props": {"spacing": 0},
              "celldata_func": (self._set_cell_data, "battery")},
-            {"id": "rssi_pb", "type": GdkPixbuf.Pixbuf, "renderer": Gtk.CellRendererPixbuf(),
+            {"id": "rssi_level", "type": int, "renderer": Gtk.CellRendererPixbuf(),
              "render_attrs": {}, "view_props": {"spacing": 0},
              "celldata_func": (self._set_cell_data, "rssi")},
-            {"id": "tpl_pb", "type": GdkPixbuf.Pixbuf, "renderer": Gtk.CellRendererPixbuf(),
+            {"id": "tpl_level", "type": int, "renderer": Gtk.CellRendererPixbuf(),
              "render_attrs": {}, "view_props": {"spacing": 0},
              "celldata_func": (self._set_cell_data, "tpl")},
             {"id": "alias", "type": str},  # used for quick access instead of device.GetProperties
@@ -73,7 +89,10 @@ class ManagerDeviceList(DeviceList):
             {"id": "cell_fader", "type": CellFade},
             {"id": "row_fader", "type": TreeRowFade},
             {"id": "initial_anim", "type": bool},
-            {"id": "blocked", "type": bool}
+            {"id": "blocked", "type": bool},
+            {"id": "klass", "type": int},  # used by the filter instead of device["Class"]
+            {"id": "search_key", "type": str},  # casefolded name, address and class for typeahead search
+            {"id": "decorated", "type": bool},  # caption, device_surface and objpush are current
         ]
         super().__init__(adapter, tabledata)
         self.set_name("ManagerDeviceList")
@@ -81,13 +100,25 @@ class ManagerDeviceList(DeviceList):
         self.props.has_tooltip = True
         self.Blueman = inst
 
-        self._monitored_devices: Set[BtAddress] = set()
+        # object path -> presentation columns computed while drawing, stored in the model once drawing is done
+        self._pending_decorations: Dict[ObjectPath, Dict[str, Any]] = {}
+        self._store_decorations_source: Optional[int] = None
+
+        # address -> row of devices whose power levels are shown
+        self._monitored_devices: Dict[BtAddress, Gtk.TreeRowReference] = {}
 
         self.manager.connect_signal("battery-created", self.on_battery_created)
         self.manager.connect_signal("battery-removed", self.on_battery_removed)
         self._batteries: Dict[str, Battery] = {}
 
         self.Config = Gio.Settings(schema_id="org.blueman.general")
+        self._hide_unnamed = self.Config["hide-unnamed"]
+        # class code -> whether an unnamed device of that class is shown anyway
+        self._unnamed_shown_classes: Dict[int, bool] = {}
+        self.adapter_cache_size = self.Config["adapter-cache-size"]
+        self.adapter_cache_rows = self.Config["adapter-cache-rows"]
+        # HCI reads can take up to a second each, they are made off the main loop
+        self._sampler = PowerLevelSampler(self._on_power_levels, self.Config["power-level-interval"] / 1000)
         self.Config.connect('changed', self._on_settings_changed)
         # Set the correct sorting
         self._on_settings_changed(self.Config, "sort-by")
@@ -111,7 +142,11 @@ class ManagerDeviceList(DeviceList):
         Gtk.Widget.drag_dest_add_uri_targets(self)
 
         self.set_search_equal_func(self.search_func)
-        self.filter.set_visible_func(self.filter_func)
+        self.set_visible_func(self.filter_func)
+
+    def destroy(self) -> None:
+        self._sampler.stop()
+        super().destroy()
 
     def _on_settings_changed(self, settings: Gio.Settings, key: str) -> None:
         if key in ('sort-by', 'sort-order'):
@@ -127,11 +162,26 @@ class ManagerDeviceList(DeviceList):
 
             if column_id:
                 self.liststore.set_sort_column_id(column_id, sort_type)
+        elif key == "hide-unnamed":
+            self._hide_unnamed = settings[key]
+            self.filter.refilter()
+        elif key in ("adapter-cache-size", "adapter-cache-rows"):
+            self.adapter_cache_size = settings["adapter-cache-size"]
+            self.adapter_cache_rows = settings["adapter-cache-rows"]
+            self.evict_cached_rows()
+        elif key == "power-level-interval":
+            self._sampler.set_interval(settings[key] / 1000)
 
     def on_icon_theme_changed(self, _icon_them: Gtk.IconTheme) -> None:
-        for row in self.liststore:
-            device = self.get(row.iter, "device")["device"]
-            self.row_setup_event(row.iter, device)
+        logging.debug(f"Dropping device icons, {self.get_icon_cache_stats()}")
+        self._icon_cache.clear()
+        self._pending_decorations = {}
+        # Rows put aside would keep the icons of the old theme
+        self.drop_cached_rows()
+        with self.batch():
+            for row in self.liststore:
+                self.set(row.iter, decorated=False)
+        self.queue_draw()
 
     def on_battery_created(self, _manager: Manager, obj_path: ObjectPath) -> None:
         if obj_path not in self._batteries:
@@ -144,24 +194,19 @@ class ManagerDeviceList(DeviceList):
             battery = self._batteries.pop(obj_path)
             battery.destroy()
 
-    def search_func(self, model: Gtk.TreeModel, column: int, key: str, tree_iter: Gtk.TreeIter) -> bool:
-        row = self.get(tree_iter, "caption")
-        if key.lower() in row["caption"].lower():
-            return False
-        logging.info(f"{model} {column} {key} {tree_iter}")
-        return True
-
-    def filter_func(self, _model: Gtk.TreeModel, tree_iter: Gtk.TreeIter, _data: Any) -> bool:
-        row = self.get(tree_iter, "no_name", "device")
-        device = row["device"]
-        klass = get_minor_class(device["Class"]) if device is not None else None
+    def search_func(self, model: Gtk.TreeModel, _column: int, key: str, tree_iter: Gtk.TreeIter) -> bool:
+        return key.casefold() not in model.get_value(tree_iter, self.ids["search_key"])
 
-        if row["no_name"] and self.Config["hide-unnamed"] and klass not in (_("Keyboard"), _("Combo")):
-            logging.info("Hiding unnamed device")
-            return False
-        else:
+    def filter_func(self, model: Gtk.TreeModel, tree_iter: Gtk.TreeIter, _data: Any) -> bool:
+        if not self._hide_unnamed or not bool(model.get_value(tree_iter, self.ids["no_name"])):
             return True
 
+        klass = int(model.get_value(tree_iter, self.ids["klass"]))
+        shown = self._unnamed_shown_classes.get(klass)
+        if shown is None:
+            shown = self._unnamed_shown_classes[klass] = get_minor_class(klass) in (_("Keyboard"), _("Combo"))
+        return shown
+
     def drag_recv(self, _widget: Gtk.Widget, context: Gdk.DragContext, x: int, y: int, selection: Gtk.SelectionData,
                   _info: int, time: int) -> None:
 
@@ -318,6 +363,27 @@ class ManagerDeviceList(DeviceList):
 
         return target
 
+    def _get_device_icon(self, device: Device) -> SurfaceObject:
+        key = (device["Icon"], device["Paired"], device["Connected"], device["Trusted"], device["Blocked"],
+               self.get_scale_factor())
+        surface_object = self._icon_cache.get(key)
+        if surface_object is not None:
+            self._icon_cache_hits += 1
+            self._icon_cache.move_to_end(key)
+            return surface_object
+
+        self._icon_cache_misses += 1
+        surface_object = SurfaceObject(self._make_device_icon(*key[:5]))
+        self._icon_cache[key] = surface_object
+        if len(self._icon_cache) > self.icon_cache_size:
+            self._icon_cache.popitem(last=False)
+        return surface_object
+
+    def get_icon_cache_stats(self) -> Dict[str, float]:
+        lookups = self._icon_cache_hits + self._icon_cache_misses
+        return {"hits": self._icon_cache_hits, "misses": self._icon_cache_misses,
+                "hit_rate": self._icon_cache_hits / lookups if lookups else 0.0, "size": len(self._icon_cache)}
+
     def device_remove_event(self, object_path: ObjectPath) -> None:
         tree_iter = self.find_device_by_path(object_path)
         assert tree_iter is not None
@@ -328,6 +394,43 @@ class ManagerDeviceList(DeviceList):
             self._prepare_fader(row_fader, lambda: self.__fader_finished(object_path))
             row_fader.animate(start=row_fader.get_state(), end=0.0, duration=400)
 
+    def rows_clear_event(self) -> None:
+        self._stop_power_level_monitors()
+        self._pending_decorations = {}
+        self.rows_drop_event(self.liststore)
+
+    def rows_hide_event(self) -> None:
+        self._stop_power_level_monitors()
+        self._pending_decorations = {}
+        # Faders draw on the rows of the shown store, none may run while their own is put aside
+        for faders in self._get_faders(self.liststore):
+            for fader in faders:
+                if fader is not None:
+                    fader.finish()
+
+    def rows_show_event(self) -> None:
+        for row in self.liststore:
+            device, connected = self.get_values(row.iter, "device", "connected")
+            if connected:
+                self._monitor_power_levels(row.iter, device)
+
+    def rows_drop_event(self, liststore: Gtk.ListStore) -> None:
+        for faders in self._get_faders(liststore):
+            for fader in faders:
+                if fader is not None:
+                    fader.stop()
+                    fader.unref()
+
+    def _get_faders(self, liststore: Gtk.ListStore) -> List[Tuple[Optional[TreeRowFade], Optional[CellFade]]]:
+        row_fader_id, cell_fader_id = self.ids["row_fader"], self.ids["cell_fader"]
+        return [(liststore.get_value(row.iter, row_fader_id), liststore.get_value(row.iter, cell_fader_id))
+                for row in liststore]
+
+    def _stop_power_level_monitors(self) -> None:
+        for address in self._monitored_devices:
+            self._sampler.remove(address)
+        self._monitored_devices = {}
+
     def __fader_finished(self, object_path: ObjectPath) -> None:
         super().device_remove_event(object_path)
 
@@ -336,6 +439,10 @@ class ManagerDeviceList(DeviceList):
         return "<span size='x-large'>%(0)s</span>\n<span size='small'>%(1)s</span>\n<i>%(2)s</i>" \
                % {"0": html.escape(name), "1": klass, "2": address}
 
+    @staticmethod
+    def make_search_key(name: str, klass: str, address: BtAddress) -> str:
+        return "\n".join((name, address, address.replace(":", ""), klass)).casefold()
+
     @staticmethod
     def make_display_name(alias: str, klass: int, address: BtAddress) -> str:
         if alias.replace("-", ":") == address:
@@ -352,7 +459,9 @@ class ManagerDeviceList(DeviceList):
             return get_major_class(device['Class'])
 
     def row_setup_event(self, tree_iter: Gtk.TreeIter, device: Device) -> None:
-        if not self.get(tree_iter, "initial_anim")["initial_anim"]:
+        faders: Dict[str, Any] = {}
+        # Rows set up again, e.g. after changing while put aside, keep their faders
+        if self.get_value(tree_iter, "row_fader") is None:
             assert self.liststore is not None
             child_path = self.liststore.get_path(tree_iter)
             result = self.filter.convert_child_path_to_path(child_path)
@@ -361,141 +470,161 @@ class ManagerDeviceList(DeviceList):
                 cell_fader = CellFade(self, child_path, [2, 3, 4, 5])
                 row_fader = TreeRowFade(self, child_path)
 
-                self.set(tree_iter, row_fader=row_fader, cell_fader=cell_fader)
-
                 cell_fader.freeze()
 
                 if result is not None:
                     self._prepare_fader(row_fader).animate(start=0.0, end=1.0, duration=500)
-                    self.set(tree_iter, initial_anim=True)
-                else:
-                    self.set(tree_iter, initial_anim=False)
 
-        has_objpush = self._has_objpush(device)
+                faders = {"row_fader": row_fader, "cell_fader": cell_fader, "initial_anim": result is not None}
+
+        # Caption, icon and objpush are left to _get_decoration, for rows that actually get drawn
+        self._pending_decorations.pop(device.get_object_path(), None)
+        display_name = self.make_display_name(device.display_name, device["Class"], device['Address'])
+        search_key = self.make_search_key(display_name, self.get_device_class(device), device['Address'])
+
+        self.set(tree_iter, alias=display_name, klass=device["Class"], search_key=search_key, decorated=False,
+                 trusted=device["Trusted"], paired=device["Paired"], connected=device["Connected"],
+                 blocked=device["Blocked"], **faders)
+
+        if device["Connected"]:
+            self._monitor_power_levels(tree_iter, device)
+
+    @staticmethod
+    def get_device_description(device: Device) -> str:
         klass = get_minor_class(device['Class'])
         # Bluetooth >= 4 devices use Appearance property
         appearance = device["Appearance"]
         if klass != _("Uncategorized") and klass != _("Unknown"):
-            description = klass
+            return klass
         elif klass == _("Unknown") and appearance:
-            description = gatt_appearance_to_name(appearance)
+            return gatt_appearance_to_name(appearance)
         else:
-            description = get_major_class(device['Class'])
+            return get_major_class(device['Class'])
 
-        surface = self._make_device_icon(device["Icon"], device["Paired"], device["Connected"], device["Trusted"],
-                                         device["Blocked"])
-        surface_object = SurfaceObject(surface)
+    def _make_decoration(self, device: Device) -> Dict[str, Any]:
         display_name = self.make_display_name(device.display_name, device["Class"], device['Address'])
-        caption = self.make_caption(display_name, description, device['Address'])
-
-        self.set(tree_iter, caption=caption, alias=display_name, objpush=has_objpush, device_surface=surface_object)
-
-        try:
-            self.row_update_event(tree_iter, "Trusted", device['Trusted'])
-        except Exception as e:
-            logging.exception(e)
-        try:
-            self.row_update_event(tree_iter, "Paired", device['Paired'])
-        except Exception as e:
-            logging.exception(e)
-        try:
-            self.row_update_event(tree_iter, "Connected", device["Connected"])
-        except Exception as e:
-            logging.exception(e)
-        try:
-            self.row_update_event(tree_iter, "Blocked", device["Blocked"])
-        except Exception as e:
-            logging.exception(e)
+        caption = self.make_caption(display_name, self.get_device_description(device), device['Address'])
+        return {"caption": caption, "device_surface": self._get_device_icon(device),
+                "objpush": self._has_objpush(device), "decorated": True}
+
+    def _get_decoration(self, tree_iter: Gtk.TreeIter) -> Tuple[str, SurfaceObject]:
+        decorated, object_path, caption, surface_object = self.get_values(tree_iter, "decorated", "dbus_path",
+                                                                          "caption", "device_surface")
+        if decorated:
+            return caption, surface_object
+
+        # Drawing must not change the model, the values are stored from an idle callback that runs before the
+        # next redraw
+        values = self._pending_decorations.get(object_path)
+        if values is None:
+            device = self.get_value(tree_iter, "device")
+            values = self._pending_decorations[object_path] = self._make_decoration(device)
+            if self._store_decorations_source is None:
+                self._store_decorations_source = GLib.idle_add(self._store_decorations,
+                                                               priority=GLib.PRIORITY_HIGH_IDLE)
+        return values["caption"], values["device_surface"]
+
+    def _store_decorations(self) -> bool:
+        self._store_decorations_source = None
+        pending, self._pending_decorations = self._pending_decorations, {}
+        for object_path, values in pending.items():
+            tree_iter = self.find_device_by_path(object_path)
+            if tree_iter is not None and not self.get_value(tree_iter, "decorated"):
+                self.set(tree_iter, **values)
+        return False
 
-        if device["Connected"]:
-            self._monitor_power_levels(tree_iter, device)
+    def decorate(self, tree_iter: Gtk.TreeIter) -> None:
+        """Makes caption, device_surface and objpush of a row current, e.g. before reading them for a row that
+        has not been drawn yet"""
+        decorated, object_path, device = self.get_values(tree_iter, "decorated", "dbus_path", "device")
+        if not decorated:
+            values = self._pending_decorations.pop(object_path, None) or self._make_decoration(device)
+            self.set(tree_iter, **values)
 
     def _monitor_power_levels(self, tree_iter: Gtk.TreeIter, device: Device) -> None:
         if device["Address"] in self._monitored_devices:
             return
 
         assert self.Adapter is not None
-        cinfo = conn_info(device["Address"], os.path.basename(self.Adapter.get_object_path()))
-        try:
-            cinfo.init()
-        except ConnInfoReadError:
-            logging.warning("Failed to get power levels, probably a LE device.")
-
         model = self.liststore
-        assert isinstance(model, Gtk.TreeModel)
-        r = Gtk.TreeRowReference.new(model, model.get_path(tree_iter))
-        self._update_power_levels(tree_iter, device, cinfo)
-        GLib.timeout_add(1000, self._check_power_levels, r, cinfo, device["Address"])
-        self._monitored_devices.add(device["Address"])
-
-    def _check_power_levels(self, row_ref: Gtk.TreeRowReference, cinfo: conn_info, address: BtAddress) -> bool:
-        if not row_ref.valid():
-            logging.warning("stopping monitor (row does not exist)")
-            cinfo.deinit()
-            self._monitored_devices.remove(address)
-            return False
-
-        tree_iter = self.get_iter(row_ref.get_path())
-        assert tree_iter is not None
+        self._monitored_devices[device["Address"]] = Gtk.TreeRowReference.new(model, model.get_path(tree_iter))
+        address_type = device["AddressType"] if "AddressType" in device else "public"
+        self._sampler.add(device["Address"], os.path.basename(self.Adapter.get_object_path()), address_type)
+
+    def _on_power_levels(self, _hci_name: str, samples: Dict[str, PowerLevels]) -> None:
+        for address, sample in samples.items():
+            row_ref = self._monitored_devices.get(BtAddress(address))
+            # Results of a round started before the device was removed
+            if row_ref is None:
+                continue
+
+            if not row_ref.valid():
+                logging.warning("stopping monitor (row does not exist)")
+                self._sampler.remove(address)
+                del self._monitored_devices[BtAddress(address)]
+                continue
+
+            tree_iter = self.get_iter(row_ref.get_path())
+            assert tree_iter is not None
 
-        device = self.get(tree_iter, "device")["device"]
+            device = self.get_value(tree_iter, "device")
 
-        if device["Connected"]:
-            self._update_power_levels(tree_iter, device, cinfo)
-            return True
-        else:
-            cinfo.deinit()
-            self._disable_power_levels(tree_iter)
-            self._monitored_devices.remove(address)
-            return False
+            if device["Connected"]:
+                self._update_power_levels(tree_iter, device, sample)
+            else:
+                self._sampler.remove(address)
+                self._disable_power_levels(tree_iter)
+                del self._monitored_devices[BtAddress(address)]
 
     def row_update_event(self, tree_iter: Gtk.TreeIter, key: str, value: Any) -> None:
         logging.info(f"{key} {value}")
 
-        device = self.get(tree_iter, "device")["device"]
+        device = self.get_value(tree_iter, "device")
+        # Collected and written in one go, so the row is changed, sorted and filtered once
+        values: Dict[str, Any] = {}
 
-        if key in ("Blocked", "Connected", "Paired", "Trusted"):
-            surface = self._make_device_icon(device["Icon"], device["Paired"], device["Connected"], device["Trusted"],
-                                             device["Blocked"])
-            self.set(tree_iter, device_surface=SurfaceObject(surface))
+        if key in ("Alias", "Appearance", "Blocked", "Class", "Connected", "Icon", "Paired", "Trusted", "UUIDs"):
+            # Redone when the row is drawn next, rows out of view cost nothing
+            self._pending_decorations.pop(device.get_object_path(), None)
+            values["decorated"] = False
 
         if key == "Trusted":
-            if value:
-                self.set(tree_iter, trusted=True)
-            else:
-                self.set(tree_iter, trusted=False)
+            values["trusted"] = bool(value)
 
         elif key == "Paired":
-            if value:
-                self.set(tree_iter, paired=True)
-            else:
-                self.set(tree_iter, paired=False)
+            values["paired"] = bool(value)
 
         elif key == "Alias":
-            c = self.make_caption(value, self.get_device_class(device), device['Address'])
-            name = self.make_display_name(device.display_name, device["Class"], device["Address"])
-            self.set(tree_iter, caption=c, alias=name)
+            klass = self.get_device_class(device)
+            values["alias"] = self.make_display_name(device.display_name, device["Class"], device["Address"])
+            values["search_key"] = self.make_search_key(values["alias"], klass, device['Address'])
 
-        elif key == "UUIDs":
-            has_objpush = self._has_objpush(device)
-            self.set(tree_iter, objpush=has_objpush)
+        elif key == "Class":
+            values["klass"] = value
+            values["search_key"] = self.make_search_key(self.get_value(tree_iter, "alias"),
+                                                        self.get_device_class(device), device["Address"])
 
         elif key == "Connected":
-            self.set(tree_iter, connected=value)
+            values["connected"] = value
 
+        elif key == "Name":
+            values["no_name"] = False
+
+        elif key == "Blocked":
+            values["blocked"] = value
+
+        if values:
+            self.set(tree_iter, **values)
+
+        if key == "Connected":
             if value:
                 self._monitor_power_levels(tree_iter, device)
             else:
                 self._disable_power_levels(tree_iter)
-        elif key == "Name":
-            self.set(tree_iter, no_name=False)
-            self.filter.refilter()
-
-        elif key == "Blocked":
-            self.set(tree_iter, blocked=value)
 
-    def _update_power_levels(self, tree_iter: Gtk.TreeIter, device: Device, cinfo: conn_info) -> None:
-        row = self.get(tree_iter, "cell_fader", "battery", "rssi", "lq", "tpl")
+    def _update_power_levels(self, tree_iter: Gtk.TreeIter, device: Device, sample: PowerLevels) -> None:
+        cell_fader, *levels = self.get_values(tree_iter, "cell_fader", "battery", "rssi", "tpl")
+        shown = dict(zip(("battery", "rssi", "tpl"), levels))
 
         bars = {}
 
@@ -503,31 +632,51 @@ class ManagerDeviceList(DeviceList):
         if obj_path in self._batteries:
             bars["battery"] = self._batteries[obj_path]["Percentage"]
 
-        # cinfo init may fail for bluetooth devices version 4 and up
+        # There is no sample without a link, or for LE links when they can only be read through HCI
         # FIXME Workaround is horrible and we should show something better
-        if cinfo.failed:
+        if sample is None:
             bars.update({"rssi": 100.0, "tpl": 100.0})
         else:
-            try:
-                bars["rssi"] = max(50 + float(cinfo.get_rssi()) / 127 * 50, 10)
-            except ConnInfoReadError:
+            rssi, tpl, max_tpl, le = sample
+            if rssi is None:
                 bars["rssi"] = 50
-            try:
-                bars["tpl"] = max(50 + float(cinfo.get_tpl()) / 127 * 50, 10)
-            except ConnInfoReadError:
-                bars["tpl"] = 50
+            elif le:
+                # An absolute value in dBm, -60 shown as optimal
+                bars["rssi"] = min(max(50 + float(rssi + 60) / 40 * 50, 10), 100)
+            else:
+                # Relative to the golden receive power range
+                bars["rssi"] = max(50 + float(rssi) / 127 * 50, 10)
 
-        if row["battery"] == row["rssi"] == row["tpl"] == 0:
-            self._prepare_fader(row["cell_fader"]).animate(start=0.0, end=1.0, duration=400)
+            if tpl is None:
+                bars["tpl"] = 50
+            elif max_tpl is not None and max_tpl > 0:
+                bars["tpl"] = min(max(float(tpl) / max_tpl * 100, 10), 100)
+            else:
+                bars["tpl"] = max(50 + float(tpl) / 127 * 50, 10)
 
-        w = 14 * self.get_scale_factor()
-        h = 48 * self.get_scale_factor()
+        if not any(levels):
+            self._prepare_fader(cell_fader).animate(start=0.0, end=1.0, duration=400)
 
+        values: Dict[str, Any] = {}
         for (name, perc) in bars.items():
-            if round(row[name], -1) != round(perc, -1):
-                icon_name = f"blueman-{name}-{int(round(perc, -1))}.png"
-                icon = GdkPixbuf.Pixbuf.new_from_file_at_scale(os.path.join(PIXMAP_PATH, icon_name), w, h, True)
-                self.set(tree_iter, **{name: perc, f"{name}_pb": icon})
+            if round(shown[name], -1) != round(perc, -1):
+                values[name] = perc
+                values[f"{name}_level"] = min(max(int(round(perc, -1)), 10), 100)
+        if values:
+            self.set(tree_iter, **values)
+
+    def _get_level_surfaces(self, scale: int) -> Dict[Tuple[str, int], cairo.ImageSurface]:
+        surfaces = self._level_surfaces.get(scale)
+        if surfaces is None:
+            window = self.get_window()
+            surfaces = {}
+            for name in ("battery", "rssi", "tpl"):
+                for level in range(10, 101, 10):
+                    path = os.path.join(PIXMAP_PATH, f"blueman-{name}-{level}.png")
+                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, 14 * scale, 48 * scale, True)
+                    surfaces[(name, level)] = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, window)
+            self._level_surfaces[scale] = surfaces
+        return surfaces
 
     def _disable_power_levels(self, tree_iter: Gtk.TreeIter) -> None:
         row = self.get(tree_iter, "cell_fader", "battery", "rssi", "tpl")
@@ -535,8 +684,8 @@ class ManagerDeviceList(DeviceList):
             return
 
         self.set(tree_iter, battery=0, rssi=0, tpl=0)
-        self._prepare_fader(row["cell_fader"], lambda: self.set(tree_iter, battery_pb=None, rssi_pb=None,
-                                                                tpl_pb=None)).animate(start=1.0, end=0.0, duration=400)
+        self._prepare_fader(row["cell_fader"], lambda: self.set(tree_iter, battery_level=0, rssi_level=0,
+                                                                tpl_level=0)).animate(start=1.0, end=0.0, duration=400)
 
     def _prepare_fader(self, fader: AnimBase, callback: Optional[Callable[[], None]] = None) -> AnimBase:
         def on_finished(finished_fader: AnimBase) -> None:
@@ -563,15 +712,16 @@ class ManagerDeviceList(DeviceList):
             tree_iter = self.get_iter(path[0])
             assert tree_iter is not None
 
-            row = self.get(tree_iter, "connected", "trusted", "paired", "blocked")
+            connected, trusted, paired, blocked = self.get_values(tree_iter, "connected", "trusted", "paired",
+                                                                  "blocked")
             str_list = []
-            if row["connected"]:
+            if connected:
                 str_list.append(_("Connected"))
-            if row["trusted"]:
+            if trusted:
                 str_list.append(_("Trusted"))
-            if row["paired"]:
+            if paired:
                 str_list.append(_("Paired"))
-            if row["blocked"]:
+            if blocked:
                 str_list.append(_("Blocked"))
 
             text = ", ".join(str_list)
@@ -584,24 +734,20 @@ class ManagerDeviceList(DeviceList):
             self.tooltip_col = path[1]
             return True
 
-        elif path[1] == self.columns["battery_pb"] \
-                or path[1] == self.columns["tpl_pb"] \
-                or path[1] == self.columns["rssi_pb"]:
+        elif path[1] == self.columns["battery_level"] \
+                or path[1] == self.columns["tpl_level"] \
+                or path[1] == self.columns["rssi_level"]:
             tree_iter = self.get_iter(path[0])
             assert tree_iter is not None
 
-            dt = self.get(tree_iter, "connected")["connected"]
-            if not dt:
+            connected, battery, rssi, tpl = self.get_values(tree_iter, "connected", "battery", "rssi", "tpl")
+            if not connected:
                 return False
 
             lines = [_("<b>Connected</b>")]
 
-            battery = self.get(tree_iter, "battery")["battery"]
-            rssi = self.get(tree_iter, "rssi")["rssi"]
-            tpl = self.get(tree_iter, "tpl")["tpl"]
-
             if battery != 0:
-                if path[1] == self.columns["battery_pb"]:
+                if path[1] == self.columns["battery_level"]:
                     lines.append(f"<b>Battery: {int(battery)}%</b>")
                 else:
                     lines.append(f"Battery: {int(battery)}%")
@@ -618,7 +764,7 @@ class ManagerDeviceList(DeviceList):
                 else:
                     rssi_state = _("Too much")
 
-                if path[1] == self.columns["rssi_pb"]:
+                if path[1] == self.columns["rssi_level"]:
                     lines.append(_("<b>Received Signal Strength: %(rssi)u%%</b> <i>(%(rssi_state)s)</i>") %
                                  {"rssi": rssi, "rssi_state": rssi_state})
                 else:
@@ -637,7 +783,7 @@ class ManagerDeviceList(DeviceList):
                 else:
                     tpl_state = _("Very High")
 
-                if path[1] == self.columns["tpl_pb"]:
+                if path[1] == self.columns["tpl_level"]:
                     lines.append(_("<b>Transmit Power Level: %(tpl)u%%</b> <i>(%(tpl_state)s)</i>") %
                                  {"tpl": tpl, "tpl_state": tpl_state})
                 else:
@@ -661,16 +807,16 @@ class ManagerDeviceList(DeviceList):
 
     def _set_cell_data(self, _col: Gtk.TreeViewColumn, cell: Gtk.CellRenderer, model: Gtk.TreeModelFilter,
                        tree_iter: Gtk.TreeIter, data: Optional[str]) -> None:
-        tree_iter = model.convert_iter_to_child_iter(tree_iter)
         if data is None:
-            row = self.get(tree_iter, "device_surface")
-            cell.set_property("surface", row["device_surface"].surface)
+            _caption, surface_object = self._get_decoration(model.convert_iter_to_child_iter(tree_iter))
+            cell.set_property("surface", surface_object.surface)
+        elif data == "caption":
+            caption, _surface_object = self._get_decoration(model.convert_iter_to_child_iter(tree_iter))
+            cell.set_property("markup", caption)
         else:
-            window = self.get_window()
-            scale = self.get_scale_factor()
-            pb = self.get(tree_iter, data + "_pb")[data + "_pb"]
-            if pb:
-                surface = Gdk.cairo_surface_create_from_pixbuf(pb, scale, window)
-                cell.set_property("surface", surface)
+            # Decoded once per scale factor, drawing only picks the surface
+            level = model.get_value(tree_iter, self.ids[data + "_level"])
+            if level:
+                cell.set_property("surface", self._get_level_surfaces(self.get_scale_factor())[(data, level)])
             else:
                 cell.set_property("surface", None)
@@ -258,6 +258,7 @@ class ManagerDeviceMenu(Gtk.Menu):
             selected = self.Blueman.List.selected()
             if not selected:
                 return
+            self.Blueman.List.decorate(selected)
             row = self.Blueman.List.get(selected, "alias", "paired", "connected", "trusted", "objpush", "device",
                                         "blocked")
         else:
@@ -275,6 +276,7 @@ class ManagerDeviceMenu(Gtk.Menu):
             child_iter = self.Blueman.List.filter.convert_iter_to_child_iter(tree_iter)
             assert child_iter is not None
 
+            self.Blueman.List.decorate(child_iter)
             row = self.Blueman.List.get(child_iter, "alias", "paired", "connected", "trusted", "objpush", "device",
                                         "blocked")
 
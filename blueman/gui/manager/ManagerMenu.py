@@ -74,6 +74,17 @@ class ManagerMenu:
         else:
             self._sort_type_item.props.active = True
 
+        item_nearby = blueman.builder.get_widget("nearby_only_item", Gtk.CheckMenuItem)
+        self.Config.bind("discovery-nearby-only", item_nearby, "active", Gio.SettingsBindFlags.DEFAULT)
+
+        self._transport_items = {
+            transport: blueman.builder.get_widget(f"transport_{transport}_item", Gtk.RadioMenuItem)
+            for transport in ("auto", "bredr", "le")
+        }
+        self._transport_items[self.Config["discovery-transport"]].props.active = True
+        for transport, item in self._transport_items.items():
+            item.connect("activate", self._on_transport_changed, transport)
+
         item_plugins = blueman.builder.get_widget("plugins_item", Gtk.ImageMenuItem)
         item_plugins.connect('activate', self._on_plugin_dialog_activate)
 
@@ -115,6 +126,10 @@ class ManagerMenu:
             else:
                 self.Config["sort-order"] = "ascending"
 
+    def _on_transport_changed(self, btn: Gtk.RadioMenuItem, transport: str) -> None:
+        if btn.props.active:
+            self.Config["discovery-transport"] = transport
+
     def _on_settings_changed(self, settings: Gio.Settings, key: str) -> None:
         value = settings[key]
         if key == 'sort-by':
@@ -131,9 +146,9 @@ class ManagerMenu:
             else:
                 if not self._sort_type_item.props.active:
                     self._sort_type_item.props.active = False
-        elif key == "hide-unnamed":
-            logging.debug("refilter")
-            self.blueman.List.filter.refilter()
+        elif key == "discovery-transport":
+            if not self._transport_items[value].props.active:
+                self._transport_items[value].props.active = True
 
     def on_device_selected(self, _lst: ManagerDeviceList, device: Optional[Device], tree_iter: Gtk.TreeIter) -> None:
         if tree_iter and device:
@@ -202,7 +217,7 @@ class ManagerMenu:
         assert isinstance(menu, Gtk.Menu)
 
         item.disconnect(self._itemhandler)
-        adapter.disconnect(self._adapterhandler)
+        adapter.disconnect_signal(self._adapterhandler)
 
         menu.remove(item)
         self._insert_adapter_item_pos -= 1
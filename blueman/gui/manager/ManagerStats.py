@@ -1,12 +1,11 @@
 from typing import TYPE_CHECKING, Optional
 
-from _blueman import device_info
+from _blueman import hci_stats
 from gi.repository import GLib
 from gi.repository import Gtk
 
 from blueman.gui.Animation import Animation
 from blueman.gui.manager.ManagerDeviceList import ManagerDeviceList
-from blueman.main.SpeedCalc import SpeedCalc
 from blueman.Functions import adapter_path_to_name
 from blueman.Functions import format_bytes
 
@@ -33,8 +32,7 @@ class ManagerStats:
 
         self.time = None
 
-        self.up_speed = SpeedCalc()
-        self.down_speed = SpeedCalc()
+        self.stats: Optional[hci_stats] = None
 
         self.im_upload = blueman.builder.get_widget("im_upload", Gtk.Image)
         self.im_download = blueman.builder.get_widget("im_download", Gtk.Image)
@@ -54,11 +52,10 @@ class ManagerStats:
         self.hci = adapter_path_to_name(adapter_path)
         if self.hci is None:
             self.hbox.props.sensitive = False
+            self.stats = None
         else:
             self.hbox.props.sensitive = True
-
-        self.up_speed.reset()
-        self.down_speed.reset()
+            self.stats = hci_stats(self.hci)
 
     def set_blinker_by_speed(self, blinker: Animation, speed: float) -> None:
 
@@ -81,16 +78,12 @@ class ManagerStats:
             blinker.set_rate(1)
 
     def _update(self) -> bool:
-        if self.hci is not None:
-            devinfo = device_info(self.hci)
-            _tx = devinfo["stat"]["byte_tx"]
-            _rx = devinfo["stat"]["byte_rx"]
-
-            tx, s_tx = format_bytes(_tx)
-            rx, s_rx = format_bytes(_rx)
+        if self.stats is not None and self.stats.refresh():
+            tx, s_tx = format_bytes(self.stats.byte_tx)
+            rx, s_rx = format_bytes(self.stats.byte_rx)
 
-            _u_speed = self.up_speed.calc(_tx)
-            _d_speed = self.down_speed.calc(_rx)
+            _u_speed = self.stats.tx_rate
+            _d_speed = self.stats.rx_rate
 
             self.set_blinker_by_speed(self.up_blinker, _u_speed)
             self.set_blinker_by_speed(self.down_blinker, _d_speed)
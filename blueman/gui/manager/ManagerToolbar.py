@@ -86,6 +86,7 @@ class ManagerToolbar:
             self.b_remove.props.sensitive = False
             self.b_send.props.sensitive = False
         else:
+            self.blueman.List.decorate(tree_iter)
             row = self.blueman.List.get(tree_iter, "paired", "trusted", "objpush")
             self.b_bond.props.sensitive = powered and not row["paired"]
             self.b_trust.props.sensitive = True
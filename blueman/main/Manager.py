@@ -1,7 +1,7 @@
 import logging
 import signal
 from gettext import gettext as _
-from typing import Optional, Any, Tuple
+from typing import Optional, Any, Tuple, Dict
 
 from blueman.bluez.Adapter import Adapter
 from blueman.bluez.Device import Device
@@ -210,11 +210,26 @@ class Blueman(Gtk.Application):
             prog.finalize()
             self.infobar_update(*e_(e))
 
-        self.List.discover_devices(error_handler=on_error)
+        self.List.discover_devices(error_handler=on_error, discovery_filter=self._get_discovery_filter())
 
         s1 = self.List.connect("discovery-progress", on_progress)
         s2 = self.List.connect("adapter-property-changed", prop_changed)
 
+    def _get_discovery_filter(self) -> Dict[str, Any]:
+        discovery_filter: Dict[str, Any] = {
+            "Transport": self.Config["discovery-transport"],
+            "DuplicateData": self.Config["discovery-duplicate-data"],
+        }
+        if self.Config["discovery-nearby-only"]:
+            discovery_filter["RSSI"] = self.Config["discovery-rssi"]
+        elif self.Config["discovery-pathloss"]:
+            discovery_filter["Pathloss"] = self.Config["discovery-pathloss"]
+        if self.Config["discovery-uuids"]:
+            discovery_filter["UUIDs"] = self.Config["discovery-uuids"]
+        if self.Config["discovery-pattern"]:
+            discovery_filter["Pattern"] = self.Config["discovery-pattern"]
+        return discovery_filter
+
     def infobar_update(self, message: str, bt: Optional[str] = None, icon_name: str = "dialog-warning") -> None:
         if icon_name == "dialog-warning":
             self._infobar.set_message_type(Gtk.MessageType.WARNING)
@@ -0,0 +1,85 @@
+import logging
+import time
+from typing import Dict, Tuple, List, Callable, Optional
+
+from _blueman import get_rfcomm_channel, resolve_rfcomm_channel, RFCOMMError
+
+ReplyHandler = Callable[[int], None]
+ErrorHandler = Callable[[RFCOMMError], None]
+
+
+class RFCOMMChannelCache:
+    """RFCOMM channels of remote services, looked up over SDP off the main loop and kept for ttl seconds per address
+    and service class"""
+
+    __instance: Optional["RFCOMMChannelCache"] = None
+
+    ttl = 600
+
+    @classmethod
+    def get_instance(cls) -> "RFCOMMChannelCache":
+        if cls.__instance is None:
+            cls.__instance = cls()
+        return cls.__instance
+
+    def __init__(self) -> None:
+        # (address, service class) -> (channel, expiry)
+        self._channels: Dict[Tuple[str, int], Tuple[int, float]] = {}
+        self._pending: Dict[Tuple[str, int], List[Tuple[ReplyHandler, ErrorHandler]]] = {}
+
+    def get(self, address: str, service_class: int) -> Optional[int]:
+        key = (address, service_class)
+        entry = self._channels.get(key)
+        if entry is None:
+            return None
+
+        channel, expiry = entry
+        if time.monotonic() >= expiry:
+            del self._channels[key]
+            return None
+        return channel
+
+    def resolve(self, address: str, service_class: int, reply_handler: ReplyHandler,
+                error_handler: ErrorHandler) -> None:
+        channel = self.get(address, service_class)
+        if channel is not None:
+            reply_handler(channel)
+            return
+
+        key = (address, service_class)
+        if key in self._pending:
+            self._pending[key].append((reply_handler, error_handler))
+            return
+
+        self._pending[key] = [(reply_handler, error_handler)]
+        resolve_rfcomm_channel(service_class, address, lambda result: self._on_resolved(key, result))
+
+    def resolve_sync(self, address: str, service_class: int) -> int:
+        channel = self.get(address, service_class)
+        if channel is None:
+            channel = get_rfcomm_channel(service_class, address)
+            if not channel:
+                raise RFCOMMError("Failed to get rfcomm channel")
+            self._store((address, service_class), channel)
+        return channel
+
+    def invalidate(self, address: Optional[str] = None, service_class: Optional[int] = None) -> None:
+        def matches(key: Tuple[str, int]) -> bool:
+            return (address is None or key[0] == address) and (service_class is None or key[1] == service_class)
+
+        for key in [key for key in self._channels if matches(key)]:
+            del self._channels[key]
+
+    def _store(self, key: Tuple[str, int], channel: int) -> None:
+        self._channels[key] = (channel, time.monotonic() + self.ttl)
+
+    def _on_resolved(self, key: Tuple[str, int], channel: Optional[int]) -> None:
+        handlers = self._pending.pop(key, [])
+        if channel is None:
+            logging.warning(f"No rfcomm channel for service class 0x{key[1]:04x} of {key[0]}")
+            for _reply_handler, error_handler in handlers:
+                error_handler(RFCOMMError("Failed to get rfcomm channel"))
+        else:
+            self._store(key, channel)
+            for reply_handler, _error_handler in handlers:
+                reply_handler(channel)
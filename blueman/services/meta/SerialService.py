@@ -7,10 +7,11 @@ from typing import Callable, Dict, Optional, List
 from gi.repository import Gio, GLib
 
 from blueman.bluez.Adapter import Adapter
-from _blueman import create_rfcomm_device, get_rfcomm_channel, RFCOMMError, rfcomm_list
+from _blueman import create_rfcomm_device, RFCOMMError, rfcomm_list
 from blueman.Service import Service, Instance
 from blueman.bluez.Device import Device
 from blueman.main.DBusProxies import Mechanism
+from blueman.main.RFCOMMChannelCache import RFCOMMChannelCache
 from blueman.Constants import RFCOMM_WATCHER_PATH
 
 
@@ -87,15 +88,21 @@ class SerialService(Service):
         # We expect this service to have a reserved UUID
         uuid = self.short_uuid
         assert uuid
-        channel = get_rfcomm_channel(uuid, self.device['Address'])
-        if channel is None or channel == 0:
-            error = RFCOMMError("Failed to get rfcomm channel")
-            if error_handler:
-                error_handler(error)
-                return True
-            else:
-                raise error
+        channels = RFCOMMChannelCache.get_instance()
+        if error_handler:
+            channels.resolve(self.device['Address'], uuid,
+                             lambda channel: self._connect_channel(channel, reply_handler, error_handler),
+                             error_handler)
+        else:
+            self._connect_channel(channels.resolve_sync(self.device['Address'], uuid), reply_handler, error_handler)
+        return True
 
+    def _connect_channel(
+        self,
+        channel: int,
+        reply_handler: Optional[Callable[[int], None]],
+        error_handler: Optional[Callable[[RFCOMMError], None]]
+    ) -> None:
         try:
             port_id = create_rfcomm_device(Adapter(obj_path=self.device["Adapter"])['Address'], self.device["Address"],
                                            channel)
@@ -109,11 +116,12 @@ class SerialService(Service):
             if reply_handler:
                 reply_handler(port_id)
         except RFCOMMError as e:
+            # The service may have moved to another channel
+            RFCOMMChannelCache.get_instance().invalidate(self.device["Address"], self.short_uuid)
             if error_handler:
                 error_handler(e)
             else:
                 raise e
-        return True
 
     def disconnect(
         self,
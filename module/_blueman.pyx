@@ -2,7 +2,15 @@
 # coding=utf-8
 #cython: language_level=3
 
+import threading
+import time
+
+from gi.repository import GLib
+from libc.math cimport exp
+from posix.time cimport clock_gettime, timespec, CLOCK_MONOTONIC
+
 cdef extern from "malloc.h":
+    cdef void *malloc(size_t size)
     cdef void free(void *ptr)
 
 cdef extern from "string.h":
@@ -13,6 +21,7 @@ cdef extern from "bluetooth/bluetooth.h":
         unsigned char b[6]
 
     int ba2str(bdaddr_t *ba, char *str)
+    int str2ba(char *str, bdaddr_t *ba)
 
 cdef extern from "bluetooth/hci.h":
     cdef struct hci_dev_stats:
@@ -81,7 +90,28 @@ cdef extern from "libblueman.h":
     cdef int connection_get_rssi(conn_info_handles *ci, signed char *ret_rssi)
     cdef int connection_get_tpl(conn_info_handles *ci, signed char *ret_tpl, unsigned char type)
     cdef int connection_close(conn_info_handles *ci)
-    cdef int c_get_rfcomm_channel "get_rfcomm_channel" (unsigned short service_class, char* btd_addr)
+
+    cdef enum:
+        ERR_GET_CONN_INFO_FAILED
+        ERR_MGMT_FAILED
+        BDADDR_BREDR
+        BDADDR_LE_PUBLIC
+        BDADDR_LE_RANDOM
+        HCI_TX_POWER_INVALID
+
+    cdef struct conn_sample:
+        bdaddr_t bdaddr
+        unsigned char le_type
+        unsigned char type
+        signed char rssi
+        signed char tpl
+        signed char max_tpl
+        int rssi_ret
+        int tpl_ret
+
+    cdef int connection_sample(int dev_id, conn_sample *samples, int count, int timeout) nogil
+    cdef int connection_sample_mgmt(int dev_id, conn_sample *samples, int count, int timeout) nogil
+    cdef int c_get_rfcomm_channel "get_rfcomm_channel" (unsigned short service_class, char* btd_addr) nogil
     cdef int get_rfcomm_list(rfcomm_dev_list_req **ret)
     cdef int c_create_rfcomm_device "create_rfcomm_device" (char *local_address, char *remote_address, int channel)
     cdef int c_release_rfcomm_device "release_rfcomm_device" (int id)
@@ -104,7 +134,8 @@ ERR = {
     -12: "Can't bind RFCOMM socket",
     -13: "Can't connect RFCOMM socket",
     -14: "Can't create RFCOMM TTY",
-    -15: "Can't release RFCOMM TTY"
+    -15: "Can't release RFCOMM TTY",
+    -16: "Management socket not usable"
     }
 
 RFCOMM_STATES = [
@@ -130,7 +161,20 @@ def get_rfcomm_channel(uuid, py_bdaddr):
 
     py_bytes = py_bdaddr.encode('UTF-8')
     cdef char* bdaddr = py_bytes
-    return c_get_rfcomm_channel(uuid, bdaddr)
+    cdef unsigned short service_class = uuid
+    cdef int channel
+    with nogil:
+        channel = c_get_rfcomm_channel(service_class, bdaddr)
+    return channel
+
+def resolve_rfcomm_channel(uuid, py_bdaddr, callback):
+    """Looks up the channel on a thread of its own and passes it, or None if there is none, to callback from the
+    main loop"""
+    def run():
+        channel = get_rfcomm_channel(uuid, py_bdaddr)
+        GLib.idle_add(callback, channel if channel else None)
+
+    threading.Thread(target=run, name="SDP", daemon=True).start()
 
 def rfcomm_list():
     cdef rfcomm_dev_list_req *dl
@@ -254,6 +298,250 @@ cdef class conn_info:
 
         return tpl
 
+cdef sample_links(int dev_id, devices, int timeout, bint mgmt):
+    cdef int count = len(devices)
+    cdef conn_sample *samples = <conn_sample *>malloc(count * sizeof(conn_sample))
+    cdef int res
+    if samples == NULL:
+        raise MemoryError()
+
+    addresses = list(devices)
+    for 0 <= i < count:
+        py_bytes_addr = addresses[i].encode("UTF-8")
+        str2ba(py_bytes_addr, &samples[i].bdaddr)
+        samples[i].le_type = BDADDR_LE_RANDOM if devices[addresses[i]] == "random" else BDADDR_LE_PUBLIC
+
+    if mgmt:
+        with nogil:
+            res = connection_sample_mgmt(dev_id, samples, count, timeout)
+    else:
+        with nogil:
+            res = connection_sample(dev_id, samples, count, timeout)
+
+    results = {}
+    try:
+        if res < 0:
+            raise ConnInfoReadError(ERR[res], res)
+
+        for 0 <= i < count:
+            if samples[i].rssi_ret == ERR_GET_CONN_INFO_FAILED:
+                # No link to read them from, e.g. a LE device read through HCI
+                results[addresses[i]] = None
+            else:
+                results[addresses[i]] = (
+                    samples[i].rssi if samples[i].rssi_ret > 0 else None,
+                    samples[i].tpl if samples[i].tpl_ret > 0 else None,
+                    samples[i].max_tpl if samples[i].max_tpl != HCI_TX_POWER_INVALID else None,
+                    samples[i].type != BDADDR_BREDR)
+    finally:
+        free(samples)
+
+    return results
+
+
+class PowerLevelSampler:
+    """Reads RSSI and transmit power level of the added devices on a thread of its own, all devices of an
+    adapter in one go, and calls callback(hci_name, results) from the main loop after each round.
+    results maps addresses to an (rssi, tpl, max_tpl, le) tuple, with None for values that could not be read,
+    or to None if the device has no link to read them from.
+
+    The values are asked for through the management socket, which knows LE links too. Without the
+    permission to use it, HCI commands are sent instead, which only reach BR/EDR links."""
+
+    def __init__(self, callback, interval=1.0, timeout=1000):
+        self._callback = callback
+        self._interval = interval
+        self._timeout = timeout
+        self._mgmt = True
+        # hci name -> address -> LE address type
+        self._devices = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def add(self, address, hci_name="hci0", address_type="public"):
+        with self._lock:
+            self._devices.setdefault(hci_name, {})[address] = address_type
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="PowerLevelSampler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def remove(self, address):
+        with self._lock:
+            for addresses in self._devices.values():
+                addresses.pop(address, None)
+            self._devices = {hci_name: addresses for hci_name, addresses in self._devices.items() if addresses}
+
+    def set_interval(self, interval):
+        self._interval = interval
+        self._wakeup.set()
+
+    def stop(self):
+        # For good, the sampler cannot be started again
+        self._stopped = True
+        self._wakeup.set()
+
+    def _deliver(self, hci_name, results):
+        if not self._stopped:
+            self._callback(hci_name, results)
+        return False
+
+    def _sample(self, dev_id, devices):
+        if self._mgmt:
+            try:
+                return sample_links(dev_id, devices, self._timeout, True)
+            except ConnInfoReadError as e:
+                if e.args[1] != ERR_MGMT_FAILED:
+                    return {address: None for address in devices}
+                self._mgmt = False
+
+        try:
+            return sample_links(dev_id, devices, self._timeout, False)
+        except ConnInfoReadError:
+            return {address: None for address in devices}
+
+    def _run(self):
+        while not self._stopped:
+            with self._lock:
+                devices = [(hci_name, dict(addresses)) for hci_name, addresses in self._devices.items()]
+
+            started = time.monotonic()
+            for hci_name, addresses in devices:
+                results = self._sample(int(hci_name[3:]), addresses)
+                GLib.idle_add(self._deliver, hci_name, results)
+
+            self._wait(started)
+
+    def _wait(self, started):
+        # Rounds start no closer than interval, however long the controllers took to answer. Being woken up only
+        # has the wait worked out again, for a changed interval or the first device added
+        while True:
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            with self._lock:
+                idle = not self._devices
+            left = self._interval - (time.monotonic() - started)
+            if not idle and left <= 0:
+                return
+            self._wakeup.wait(None if idle else left)
+
+
+cdef enum:
+    # Samples kept for the moving window, a window of more than this many refreshes is cut short
+    WINDOW_SAMPLES = 64
+
+
+cdef class hci_stats:
+    """Byte counters of an adapter and the rates derived from them, refreshed in place.
+
+    rx_rate and tx_rate are averaged over the last window seconds, rx_ewma and tx_ewma are exponentially
+    weighted with a time constant of ewma_time seconds. history holds the last history_size (rx_rate, tx_rate)
+    pairs in a ring, history_pos is the row written next and so the oldest once the ring is full."""
+
+    cdef hci_dev_info di
+    cdef int dev_id
+    cdef double window
+    cdef double ewma_time
+
+    cdef double win_time[WINDOW_SAMPLES]
+    cdef unsigned long win_rx[WINDOW_SAMPLES]
+    cdef unsigned long win_tx[WINDOW_SAMPLES]
+    cdef int win_start
+    cdef int win_len
+
+    cdef readonly double rx_rate
+    cdef readonly double tx_rate
+    cdef readonly double rx_ewma
+    cdef readonly double tx_ewma
+
+    cdef object _history
+    cdef double *history_buf
+    cdef readonly int history_size
+    cdef readonly int history_pos
+    cdef readonly int history_len
+
+    def __init__(self, py_hci_name="hci0", window=3.0, ewma_time=3.0, history_size=60):
+        self.dev_id = int(py_hci_name[3:])
+        self.window = window
+        self.ewma_time = ewma_time
+        self.history_size = history_size
+        self._history = bytearray(history_size * 2 * sizeof(double))
+        self.history_buf = <double *> <char *> self._history
+        self.reset()
+
+    def reset(self):
+        self.win_start = 0
+        self.win_len = 0
+        self.rx_rate = self.tx_rate = self.rx_ewma = self.tx_ewma = 0.0
+        self.history_pos = 0
+        self.history_len = 0
+
+    @property
+    def byte_rx(self):
+        return self.di.stat.byte_rx
+
+    @property
+    def byte_tx(self):
+        return self.di.stat.byte_tx
+
+    @property
+    def history(self):
+        return memoryview(self._history).cast("d", (self.history_size, 2))
+
+    def refresh(self):
+        cdef timespec ts
+        cdef double now, elapsed, alpha
+        cdef int last, first
+
+        if hci_devinfo(self.dev_id, &self.di) < 0:
+            return False
+
+        clock_gettime(CLOCK_MONOTONIC, &ts)
+        now = ts.tv_sec + ts.tv_nsec / 1e9
+
+        if self.win_len:
+            last = (self.win_start + self.win_len - 1) % WINDOW_SAMPLES
+            # The counters start over when the adapter is reset
+            if self.di.stat.byte_rx < self.win_rx[last] or self.di.stat.byte_tx < self.win_tx[last]:
+                self.reset()
+            elif now > self.win_time[last]:
+                elapsed = now - self.win_time[last]
+                alpha = 1.0 - exp(-elapsed / self.ewma_time) if self.ewma_time > 0 else 1.0
+                self.rx_ewma += alpha * ((self.di.stat.byte_rx - self.win_rx[last]) / elapsed - self.rx_ewma)
+                self.tx_ewma += alpha * ((self.di.stat.byte_tx - self.win_tx[last]) / elapsed - self.tx_ewma)
+
+        if self.win_len == WINDOW_SAMPLES:
+            self.win_start = (self.win_start + 1) % WINDOW_SAMPLES
+            self.win_len -= 1
+        last = (self.win_start + self.win_len) % WINDOW_SAMPLES
+        self.win_time[last] = now
+        self.win_rx[last] = self.di.stat.byte_rx
+        self.win_tx[last] = self.di.stat.byte_tx
+        self.win_len += 1
+
+        # Samples older than the window are dropped, one is kept from before it to measure from
+        while self.win_len > 2 and now - self.win_time[(self.win_start + 1) % WINDOW_SAMPLES] >= self.window:
+            self.win_start = (self.win_start + 1) % WINDOW_SAMPLES
+            self.win_len -= 1
+
+        first = self.win_start
+        if self.win_len > 1 and now > self.win_time[first]:
+            self.rx_rate = (self.di.stat.byte_rx - self.win_rx[first]) / (now - self.win_time[first])
+            self.tx_rate = (self.di.stat.byte_tx - self.win_tx[first]) / (now - self.win_time[first])
+
+        if self.history_size:
+            self.history_buf[self.history_pos * 2] = self.rx_rate
+            self.history_buf[self.history_pos * 2 + 1] = self.tx_rate
+            self.history_pos = (self.history_pos + 1) % self.history_size
+            if self.history_len < self.history_size:
+                self.history_len += 1
+
+        return True
+
+
 def device_info(py_hci_name="hci0"):
     py_bytes_hci_name = py_hci_name.encode("UTF-8")
     cdef char* hci_name = py_bytes_hci_name
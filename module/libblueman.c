@@ -19,16 +19,19 @@
  *
  */
 
+#include <pthread.h>
 #include <netinet/in.h>
 #include <arpa/inet.h>
 #include <ctype.h>
 #include <fcntl.h>
+#include <poll.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <sys/ioctl.h>
 #include <sys/socket.h>
 #include <sys/time.h>
+#include <time.h>
 #include <unistd.h>
 #include <linux/sockios.h>
 #include <linux/if.h>
@@ -132,6 +135,93 @@ int _destroy_bridge(const char* name) {
 	return 0;
 }
 
+/* The kernel refuses connection lists larger than two pages */
+#define CONN_LIST_MAX ((2 * 4096 - sizeof(struct hci_conn_list_req)) / sizeof(struct hci_conn_info))
+
+/* One HCI socket per adapter, shared by all users and closed with the last */
+struct hci_sock {
+	int dev_id;
+	int dd;
+	unsigned int refs;
+	/* Requests wait for their reply on the socket, one at a time */
+	pthread_mutex_t lock;
+	struct hci_sock *next;
+};
+
+static struct hci_sock *hci_socks = NULL;
+static pthread_mutex_t hci_socks_lock = PTHREAD_MUTEX_INITIALIZER;
+
+static struct hci_sock *hci_sock_ref(int dev_id)
+{
+	struct hci_sock *sock;
+
+	pthread_mutex_lock(&hci_socks_lock);
+	for (sock = hci_socks; sock; sock = sock->next)
+		if (sock->dev_id == dev_id)
+			break;
+
+	if (sock) {
+		sock->refs++;
+	} else if ((sock = malloc(sizeof(*sock)))) {
+		sock->dd = hci_open_dev(dev_id);
+		if (sock->dd < 0) {
+			free(sock);
+			sock = NULL;
+		} else {
+			sock->dev_id = dev_id;
+			sock->refs = 1;
+			pthread_mutex_init(&sock->lock, NULL);
+			sock->next = hci_socks;
+			hci_socks = sock;
+		}
+	}
+	pthread_mutex_unlock(&hci_socks_lock);
+
+	return sock;
+}
+
+static void hci_sock_unref(struct hci_sock *sock)
+{
+	struct hci_sock **link;
+
+	pthread_mutex_lock(&hci_socks_lock);
+	if (--sock->refs == 0) {
+		for (link = &hci_socks; *link != sock; link = &(*link)->next)
+			;
+		*link = sock->next;
+		hci_close_dev(sock->dd);
+		pthread_mutex_destroy(&sock->lock);
+		free(sock);
+	}
+	pthread_mutex_unlock(&hci_socks_lock);
+}
+
+/* Lists all links of the adapter, growing the request until the kernel has room to spare */
+static struct hci_conn_list_req *get_conn_list(int s, int dev_id)
+{
+	struct hci_conn_list_req *cl = NULL;
+	size_t size = 16;
+
+	for (;;) {
+		free(cl);
+		if (!(cl = malloc(size * sizeof(struct hci_conn_info) + sizeof(*cl))))
+			return NULL;
+
+		cl->dev_id = dev_id;
+		cl->conn_num = size;
+
+		if (ioctl(s, HCIGETCONNLIST, (void *) cl)) {
+			free(cl);
+			return NULL;
+		}
+
+		if (cl->conn_num < size || size >= CONN_LIST_MAX)
+			return cl;
+
+		size = size * 2 > CONN_LIST_MAX ? CONN_LIST_MAX : size * 2;
+	}
+}
+
 static int find_conn(int s, int dev_id, long arg)
 {
 	struct hci_conn_list_req *cl;
@@ -139,23 +229,16 @@ static int find_conn(int s, int dev_id, long arg)
 	int i;
 	int ret = 0;
 
-	if (!(cl = malloc(10 * sizeof(*ci) + sizeof(*cl))))
-		goto out;
+	if (!(cl = get_conn_list(s, dev_id)))
+		return 0;
 
-	cl->dev_id = dev_id;
-	cl->conn_num = 10;
 	ci = cl->conn_info;
-
-	if (ioctl(s, HCIGETCONNLIST, (void *) cl))
-		goto out;
-
 	for (i = 0; i < cl->conn_num; i++, ci++)
 		if (!bacmp((bdaddr_t *) arg, &ci->bdaddr)) {
 			ret = 1;
-			goto out;
+			break;
 		}
 
-out:
 	free(cl);
 	return ret;
 }
@@ -165,9 +248,9 @@ out:
 int connection_init(int dev_id, char *addr, struct conn_info_handles *ci)
 {
 	struct hci_conn_info_req *cr = NULL;
+	struct hci_sock *sock = NULL;
 	bdaddr_t bdaddr;
-	
-	int dd;
+
 	int ret = 1;
 
 	str2ba(addr, &bdaddr);
@@ -180,8 +263,8 @@ int connection_init(int dev_id, char *addr, struct conn_info_handles *ci)
 		}
 	}
 
-	dd = hci_open_dev(dev_id);
-	if (dd < 0) {
+	sock = hci_sock_ref(dev_id);
+	if (!sock) {
 		ret = ERR_HCI_DEV_OPEN_FAILED;
 		goto out;
 	}
@@ -194,25 +277,37 @@ int connection_init(int dev_id, char *addr, struct conn_info_handles *ci)
 
 	bacpy(&cr->bdaddr, &bdaddr);
 	cr->type = ACL_LINK;
-	if (ioctl(dd, HCIGETCONNINFO, (unsigned long) cr) < 0) {
+	if (ioctl(sock->dd, HCIGETCONNINFO, (unsigned long) cr) < 0) {
 		ret = ERR_GET_CONN_INFO_FAILED;
 		goto out;
 	}
-	
-	ci->dd = dd;
+
+	ci->sock = sock;
+	ci->dd = sock->dd;
 	ci->handle = cr->conn_info->handle;
+	sock = NULL;
 
 out:
+	if (sock)
+		hci_sock_unref(sock);
 	if (cr)
 		free(cr);
-	
+
 	return ret;
 }
 
 int connection_get_rssi(struct conn_info_handles *ci, int8_t *ret_rssi)
 {
 	int8_t rssi;
-	if (hci_read_rssi(ci->dd, htobs(ci->handle), &rssi, 1000) < 0) {
+	int err;
+
+	if (!ci->sock)
+		return ERR_NOT_CONNECTED;
+
+	pthread_mutex_lock(&ci->sock->lock);
+	err = hci_read_rssi(ci->dd, htobs(ci->handle), &rssi, 1000);
+	pthread_mutex_unlock(&ci->sock->lock);
+	if (err < 0) {
 		return ERR_READ_RSSI_FAILED;
 	}
 	*ret_rssi = rssi;
@@ -223,7 +318,15 @@ int connection_get_rssi(struct conn_info_handles *ci, int8_t *ret_rssi)
 int connection_get_tpl(struct conn_info_handles *ci, int8_t *ret_tpl, uint8_t type)
 { 	
 	int8_t level;
-	if (hci_read_transmit_power_level(ci->dd, htobs(ci->handle), type, &level, 1000) < 0) {
+	int err;
+
+	if (!ci->sock)
+		return ERR_NOT_CONNECTED;
+
+	pthread_mutex_lock(&ci->sock->lock);
+	err = hci_read_transmit_power_level(ci->dd, htobs(ci->handle), type, &level, 1000);
+	pthread_mutex_unlock(&ci->sock->lock);
+	if (err < 0) {
 		return ERR_READ_TPL_FAILED;
 	}
 	*ret_tpl = level;
@@ -232,10 +335,245 @@ int connection_get_tpl(struct conn_info_handles *ci, int8_t *ret_tpl, uint8_t ty
 	
 int connection_close(struct conn_info_handles *ci)
 {
-	hci_close_dev(ci->dd);
+	if (ci->sock) {
+		hci_sock_unref(ci->sock);
+		ci->sock = NULL;
+	}
 	return 1;
 }
 
+int connection_sample(int dev_id, struct conn_sample *samples, int count, int timeout)
+{
+	struct hci_conn_info_req *cr;
+	struct hci_sock *sock;
+	uint16_t handle;
+	int dd;
+	int i;
+
+	sock = hci_sock_ref(dev_id);
+	if (!sock)
+		return ERR_HCI_DEV_OPEN_FAILED;
+	dd = sock->dd;
+
+	cr = malloc(sizeof(*cr) + sizeof(struct hci_conn_info));
+	if (!cr) {
+		hci_sock_unref(sock);
+		return ERR_CANNOT_ALLOCATE;
+	}
+
+	/* Handles are looked up each time as they change on reconnect */
+	pthread_mutex_lock(&sock->lock);
+	for (i = 0; i < count; i++) {
+		bacpy(&cr->bdaddr, &samples[i].bdaddr);
+		cr->type = ACL_LINK;
+		samples[i].type = BDADDR_BREDR;
+		samples[i].max_tpl = HCI_TX_POWER_INVALID;
+		if (ioctl(dd, HCIGETCONNINFO, (unsigned long) cr) < 0) {
+			samples[i].rssi_ret = ERR_GET_CONN_INFO_FAILED;
+			samples[i].tpl_ret = ERR_GET_CONN_INFO_FAILED;
+			continue;
+		}
+		handle = htobs(cr->conn_info->handle);
+
+		if (hci_read_rssi(dd, handle, &samples[i].rssi, timeout) < 0)
+			samples[i].rssi_ret = ERR_READ_RSSI_FAILED;
+		else
+			samples[i].rssi_ret = 1;
+
+		if (hci_read_transmit_power_level(dd, handle, 0, &samples[i].tpl, timeout) < 0)
+			samples[i].tpl_ret = ERR_READ_TPL_FAILED;
+		else
+			samples[i].tpl_ret = 1;
+	}
+
+	pthread_mutex_unlock(&sock->lock);
+
+	free(cr);
+	hci_sock_unref(sock);
+	return 1;
+}
+
+struct mgmt_hdr {
+	uint16_t opcode;
+	uint16_t index;
+	uint16_t len;
+} __attribute__((packed));
+
+struct mgmt_cp_get_conn_info {
+	bdaddr_t bdaddr;
+	uint8_t type;
+} __attribute__((packed));
+
+struct mgmt_rp_get_conn_info {
+	bdaddr_t bdaddr;
+	uint8_t type;
+	int8_t rssi;
+	int8_t tx_power;
+	int8_t max_tx_power;
+} __attribute__((packed));
+
+struct mgmt_ev_cmd_complete {
+	uint16_t opcode;
+	uint8_t status;
+	struct mgmt_rp_get_conn_info rp;
+} __attribute__((packed));
+
+struct mgmt_ev_cmd_status {
+	uint16_t opcode;
+	uint8_t status;
+} __attribute__((packed));
+
+/* One management socket for the process, commands of a round are sent at once and their replies matched by
+ * address as they come in */
+static int mgmt_fd = -1;
+static pthread_mutex_t mgmt_lock = PTHREAD_MUTEX_INITIALIZER;
+
+static int mgmt_open(void)
+{
+	struct sockaddr_hci addr;
+	int fd;
+
+	fd = socket(AF_BLUETOOTH, SOCK_RAW | SOCK_CLOEXEC | SOCK_NONBLOCK, BTPROTO_HCI);
+	if (fd < 0)
+		return -1;
+
+	memset(&addr, 0, sizeof(addr));
+	addr.hci_family = AF_BLUETOOTH;
+	addr.hci_dev = HCI_DEV_NONE;
+	addr.hci_channel = HCI_CHANNEL_CONTROL;
+	if (bind(fd, (struct sockaddr *) &addr, sizeof(addr)) < 0) {
+		close(fd);
+		return -1;
+	}
+
+	return fd;
+}
+
+static int mgmt_send_get_conn_info(int dev_id, const bdaddr_t *bdaddr, uint8_t type)
+{
+	struct {
+		struct mgmt_hdr hdr;
+		struct mgmt_cp_get_conn_info cp;
+	} __attribute__((packed)) req;
+
+	req.hdr.opcode = htobs(MGMT_OP_GET_CONN_INFO);
+	req.hdr.index = htobs(dev_id);
+	req.hdr.len = htobs(sizeof(req.cp));
+	bacpy(&req.cp.bdaddr, bdaddr);
+	req.cp.type = type;
+
+	return write(mgmt_fd, &req, sizeof(req)) == sizeof(req) ? 0 : -1;
+}
+
+static long elapsed_ms(const struct timespec *since)
+{
+	struct timespec now;
+
+	clock_gettime(CLOCK_MONOTONIC, &now);
+	return (now.tv_sec - since->tv_sec) * 1000 + (now.tv_nsec - since->tv_nsec) / 1000000;
+}
+
+int connection_sample_mgmt(int dev_id, struct conn_sample *samples, int count, int timeout)
+{
+	uint8_t buf[sizeof(struct mgmt_hdr) + sizeof(struct mgmt_ev_cmd_complete)];
+	struct mgmt_hdr *hdr = (struct mgmt_hdr *) buf;
+	struct mgmt_ev_cmd_complete *ev = (struct mgmt_ev_cmd_complete *) (buf + sizeof(*hdr));
+	struct pollfd pfd;
+	struct timespec started;
+	int pending = 0;
+	int ret = 1;
+	ssize_t len;
+	long left;
+	int i;
+
+	pthread_mutex_lock(&mgmt_lock);
+	if (mgmt_fd < 0 && (mgmt_fd = mgmt_open()) < 0) {
+		ret = ERR_MGMT_FAILED;
+		goto out;
+	}
+
+	/* Replies that came after an earlier round timed out would be taken for ones of this round */
+	while (read(mgmt_fd, buf, sizeof(buf)) >= 0)
+		;
+
+	/* BR/EDR first, the LE address type if there is no such link */
+	for (i = 0; i < count; i++) {
+		samples[i].type = BDADDR_BREDR;
+		samples[i].rssi_ret = ERR_READ_RSSI_FAILED;
+		samples[i].tpl_ret = ERR_READ_TPL_FAILED;
+		samples[i].max_tpl = HCI_TX_POWER_INVALID;
+		if (mgmt_send_get_conn_info(dev_id, &samples[i].bdaddr, BDADDR_BREDR) < 0) {
+			ret = ERR_MGMT_FAILED;
+			goto out;
+		}
+		pending++;
+	}
+
+	clock_gettime(CLOCK_MONOTONIC, &started);
+	pfd.fd = mgmt_fd;
+	pfd.events = POLLIN;
+
+	while (pending > 0 && (left = timeout - elapsed_ms(&started)) > 0) {
+		if (poll(&pfd, 1, left) <= 0)
+			continue;
+
+		len = read(mgmt_fd, buf, sizeof(buf));
+		if (len < (ssize_t) sizeof(*hdr))
+			continue;
+
+		/* Other events are sent to every management socket */
+		if (btohs(hdr->index) != dev_id)
+			continue;
+
+		if (btohs(hdr->opcode) == MGMT_EV_CMD_STATUS &&
+		    len >= (ssize_t) (sizeof(*hdr) + sizeof(struct mgmt_ev_cmd_status)) &&
+		    btohs(((struct mgmt_ev_cmd_status *) ev)->opcode) == MGMT_OP_GET_CONN_INFO) {
+			/* Rejected before looking up the link, e.g. for lack of permission */
+			ret = ERR_MGMT_FAILED;
+			goto out;
+		}
+
+		if (btohs(hdr->opcode) != MGMT_EV_CMD_COMPLETE || len < (ssize_t) sizeof(buf) ||
+		    btohs(ev->opcode) != MGMT_OP_GET_CONN_INFO)
+			continue;
+
+		/* rssi_ret is ERR_READ_RSSI_FAILED until the reply came */
+		for (i = 0; i < count; i++) {
+			if (samples[i].rssi_ret != ERR_READ_RSSI_FAILED || samples[i].type != ev->rp.type ||
+			    bacmp(&samples[i].bdaddr, &ev->rp.bdaddr))
+				continue;
+
+			if (ev->status == MGMT_STATUS_SUCCESS) {
+				samples[i].rssi = ev->rp.rssi;
+				samples[i].tpl = ev->rp.tx_power;
+				samples[i].max_tpl = ev->rp.max_tx_power;
+				samples[i].rssi_ret = 1;
+				samples[i].tpl_ret = ev->rp.tx_power == HCI_TX_POWER_INVALID ? ERR_READ_TPL_FAILED : 1;
+				pending--;
+			} else if (ev->status == MGMT_STATUS_NOT_CONNECTED && samples[i].type == BDADDR_BREDR) {
+				samples[i].type = samples[i].le_type;
+				if (mgmt_send_get_conn_info(dev_id, &samples[i].bdaddr, samples[i].type) < 0) {
+					ret = ERR_MGMT_FAILED;
+					goto out;
+				}
+			} else {
+				samples[i].rssi_ret = ERR_GET_CONN_INFO_FAILED;
+				samples[i].tpl_ret = ERR_GET_CONN_INFO_FAILED;
+				pending--;
+			}
+			break;
+		}
+	}
+
+out:
+	if (ret == ERR_MGMT_FAILED && mgmt_fd >= 0) {
+		close(mgmt_fd);
+		mgmt_fd = -1;
+	}
+	pthread_mutex_unlock(&mgmt_lock);
+	return ret;
+}
+
 int
 get_rfcomm_channel(uint16_t service_class, char* btd_addr) {
     bdaddr_t target;
@@ -11,16 +11,58 @@
 #define ERR_CONNECT_FAILED -13
 #define ERR_CREATE_DEV_FAILED -14
 #define ERR_RELEASE_DEV_FAILED -15
+#define ERR_MGMT_FAILED -16
+
+#ifndef HCI_CHANNEL_CONTROL
+#define HCI_CHANNEL_CONTROL 3
+#endif
+
+#ifndef BDADDR_BREDR
+#define BDADDR_BREDR 0x00
+#define BDADDR_LE_PUBLIC 0x01
+#define BDADDR_LE_RANDOM 0x02
+#endif
+
+#ifndef HCI_TX_POWER_INVALID
+#define HCI_TX_POWER_INVALID 127
+#endif
+
+#define MGMT_OP_GET_CONN_INFO 0x0031
+#define MGMT_EV_CMD_COMPLETE 0x0001
+#define MGMT_EV_CMD_STATUS 0x0002
+#define MGMT_STATUS_SUCCESS 0x00
+#define MGMT_STATUS_NOT_CONNECTED 0x02
+
+struct hci_sock;
 
 struct conn_info_handles {
 	unsigned int handle;
 	int dd;
+	/* Shared with all other users of the adapter */
+	struct hci_sock *sock;
+};
+
+struct conn_sample {
+	bdaddr_t bdaddr;
+	/* BDADDR_LE_PUBLIC or BDADDR_LE_RANDOM, looked up if there is no BR/EDR link */
+	uint8_t le_type;
+	/* Of the link the values were read from */
+	uint8_t type;
+	int8_t rssi;
+	int8_t tpl;
+	/* HCI_TX_POWER_INVALID if not known */
+	int8_t max_tpl;
+	/* 1 if read, else the error */
+	int rssi_ret;
+	int tpl_ret;
 };
 
 int connection_init(int dev_id, char *addr, struct conn_info_handles *ci);
 int connection_get_rssi(struct conn_info_handles *ci, int8_t *ret_rssi);
 int connection_get_tpl(struct conn_info_handles *ci, int8_t *ret_tpl, uint8_t type);
 int connection_close(struct conn_info_handles *ci);
+int connection_sample(int dev_id, struct conn_sample *samples, int count, int timeout);
+int connection_sample_mgmt(int dev_id, struct conn_sample *samples, int count, int timeout);
 int get_rfcomm_channel(uint16_t uuid, char* btd_addr);
 int get_rfcomm_list(struct rfcomm_dev_list_req **result);
 int create_rfcomm_device(char *local_address, char *remote_address, int channel);
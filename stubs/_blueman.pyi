@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Tuple
 from typing_extensions import TypedDict
 
 ERR: Dict[int, str]
@@ -47,10 +47,38 @@ class conn_info:
     def get_tpl(self) -> int: ...
     def init(self) -> None: ...
 
+_PowerLevels = Optional[Tuple[Optional[int], Optional[int], Optional[int], bool]]
+
+class PowerLevelSampler:
+    def __init__(self, callback: Callable[[str, Dict[str, _PowerLevels]], None], interval: float = 1.0,
+                 timeout: int = 1000) -> None: ...
+    def add(self, address: str, hci_name: str = "hci0", address_type: str = "public") -> None: ...
+    def remove(self, address: str) -> None: ...
+    def set_interval(self, interval: float) -> None: ...
+    def stop(self) -> None: ...
+
+class hci_stats:
+    byte_rx: int
+    byte_tx: int
+    rx_rate: float
+    tx_rate: float
+    rx_ewma: float
+    tx_ewma: float
+    history: memoryview
+    history_size: int
+    history_pos: int
+    history_len: int
+
+    def __init__(self, hci_name: str = "hci0", window: float = 3.0, ewma_time: float = 3.0,
+                 history_size: int = 60) -> None: ...
+    def refresh(self) -> bool: ...
+    def reset(self) -> None: ...
+
 def create_bridge(name: str = "pan1") -> None: ...
 def create_rfcomm_device(local_address: str, remote_address: str, channel: int) -> int: ...
 def destroy_bridge(name: str = "pan1") -> None: ...
 def device_info(hci_name: str = "hci0") -> _HciInfo: ...
 def get_rfcomm_channel(uuid: int, bdaddr: str) -> Optional[int]: ...
+def resolve_rfcomm_channel(uuid: int, bdaddr: str, callback: Callable[[Optional[int]], None]) -> None: ...
 def release_rfcomm_device(id: int) -> int: ...
 def rfcomm_list() -> List[_RfcommDev]: ...
@@ -0,0 +1,166 @@
+import gc
+import weakref
+from collections import OrderedDict
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from gi.repository import GObject, GLib
+
+from blueman.bluez.Base import BaseMeta, Base
+from blueman.bluez.errors import BluezDBusException, DBusCancelledError
+
+
+class Dummy(GObject.Object, metaclass=BaseMeta):
+    def __init__(self, obj_path: str) -> None:
+        super().__init__()
+        self.obj_path = obj_path
+
+
+@patch("blueman.bluez.Base.BaseMeta._recent", new_callable=OrderedDict)
+class TestBaseMeta(TestCase):
+    def tearDown(self) -> None:
+        Dummy.__instances__.clear()
+
+    def test_same_instance(self, _recent: OrderedDict) -> None:
+        self.assertIs(Dummy(obj_path="/a"), Dummy(obj_path="/a"))
+        self.assertIsNot(Dummy(obj_path="/a"), Dummy(obj_path="/b"))
+
+    @patch("blueman.bluez.Base.BaseMeta.registry_limit", 2)
+    def test_unreferenced_instances_are_dropped(self, recent: OrderedDict) -> None:
+        first = weakref.ref(Dummy(obj_path="/a"))
+        Dummy(obj_path="/b")
+        Dummy(obj_path="/c")
+        gc.collect()
+        self.assertNotIn("/a", Dummy.__instances__)
+        self.assertEqual(len(recent), 2)
+        self.assertIsNone(first())
+
+    @patch("blueman.bluez.Base.BaseMeta.registry_limit", 1)
+    def test_referenced_instances_survive(self, _recent: OrderedDict) -> None:
+        kept = Dummy(obj_path="/a")
+        Dummy(obj_path="/b")
+        gc.collect()
+        self.assertIs(Dummy(obj_path="/a"), kept)
+
+    def test_evict(self, _recent: OrderedDict) -> None:
+        kept = Dummy(obj_path="/a")
+        Dummy.evict("/a")
+        self.assertIsNot(Dummy(obj_path="/a"), kept)
+        self.assertGreaterEqual(BaseMeta.live_instances(), 1)
+
+
+class Thing(Base):
+    _interface_name = "org.bluez.Thing1"
+
+
+@patch("blueman.bluez.Base.PropertyCache")
+@patch("blueman.bluez.Base.PropertiesDispatcher")
+@patch("blueman.bluez.Base.Gio.bus_get_sync")
+class TestBase(TestCase):
+    def test_construction_does_not_call(self, bus_mock: Mock, dispatcher_mock: Mock, cache_mock: Mock) -> None:
+        thing = Thing(obj_path="/org/bluez/thing")
+        self.assertEqual(thing.get_object_path(), "/org/bluez/thing")
+        bus_mock.return_value.call.assert_not_called()
+        bus_mock.return_value.call_sync.assert_not_called()
+
+    def test_get_from_cache(self, bus_mock: Mock, dispatcher_mock: Mock, cache_mock: Mock) -> None:
+        cache_mock.get_instance.return_value.get.return_value = "Thing"
+        self.assertEqual(Thing(obj_path="/org/bluez/thing2")["Alias"], "Thing")
+        bus_mock.return_value.call_sync.assert_not_called()
+
+    def test_missing_property_of_complete_object(self, bus_mock: Mock, dispatcher_mock: Mock,
+                                                 cache_mock: Mock) -> None:
+        cache_mock.get_instance.return_value.get.side_effect = KeyError("Class")
+        cache_mock.get_instance.return_value.is_complete.return_value = True
+        thing = Thing(obj_path="/org/bluez/thing6")
+        self.assertEqual(thing["Class"], 0)
+        self.assertRaises(BluezDBusException, thing.get, "Modalias")
+        bus_mock.return_value.call_sync.assert_not_called()
+
+    def test_destroy_removes_listener(self, bus_mock: Mock, dispatcher_mock: Mock, cache_mock: Mock) -> None:
+        dispatcher = dispatcher_mock.get_instance.return_value
+        dispatcher.add_listener.return_value = 7
+        thing = Thing(obj_path="/org/bluez/thing3")
+        thing.destroy()
+        dispatcher.remove_listener.assert_called_once_with(7)
+        self.assertNotIn("/org/bluez/thing3", Thing.__instances__)
+
+    @patch("blueman.bluez.Base.BaseMeta._recent", new_callable=OrderedDict)
+    @patch("blueman.bluez.Base.BaseMeta.registry_limit", 1)
+    def test_connected_instances_survive(self, _recent: OrderedDict, bus_mock: Mock, dispatcher_mock: Mock,
+                                         cache_mock: Mock) -> None:
+        thing = Thing(obj_path="/org/bluez/thing7")
+        handler_id = thing.connect_signal("property-changed", Mock())
+        ref = weakref.ref(thing)
+        del thing
+        Thing(obj_path="/org/bluez/thing8")
+        gc.collect()
+        self.assertIsNotNone(ref())
+
+        ref().disconnect_signal(handler_id)
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_identical_calls_are_coalesced(self, bus_mock: Mock, dispatcher_mock: Mock, cache_mock: Mock) -> None:
+        thing = Thing(obj_path="/org/bluez/thing4")
+        first, second = Mock(), Mock()
+        cancellable = thing._call("Connect", reply_handler=first)
+        self.assertIsNot(thing._call("Connect", reply_handler=second), cancellable)
+        thing._call("Disconnect")
+        self.assertEqual(bus_mock.return_value.call.call_count, 2)
+
+        callback = bus_mock.return_value.call.call_args_list[0][0][-1]
+        bus_mock.return_value.call_finish.return_value.unpack.return_value = ()
+        callback(bus_mock.return_value, Mock())
+        first.assert_called_once_with()
+        second.assert_called_once_with()
+
+        thing._call("Connect")
+        self.assertEqual(bus_mock.return_value.call.call_count, 3)
+
+    @patch("blueman.bluez.Base.Gio.Cancellable")
+    @patch("blueman.bluez.Base.GObject.GObject.connect")
+    def test_coalesced_call_is_cancelled_by_all_callers(self, connect_mock: Mock, cancellable_mock: Mock,
+                                                        bus_mock: Mock, dispatcher_mock: Mock,
+                                                        cache_mock: Mock) -> None:
+        first_handle, second_handle, shared = Mock(), Mock(), Mock()
+        cancellable_mock.side_effect = [first_handle, shared, second_handle]
+        for handle in (first_handle, second_handle):
+            handle.is_cancelled.return_value = False
+
+        thing = Thing(obj_path="/org/bluez/thing5")
+        first_error, second_reply = Mock(), Mock()
+        self.assertIs(thing._call("Pair", error_handler=first_error), first_handle)
+        self.assertIs(thing._call("Pair", reply_handler=second_reply), second_handle)
+        on_first_cancelled = connect_mock.call_args_list[0][0][2]
+        on_second_cancelled = connect_mock.call_args_list[1][0][2]
+
+        first_handle.is_cancelled.return_value = True
+        on_first_cancelled(first_handle)
+        shared.cancel.assert_not_called()
+
+        callback = bus_mock.return_value.call.call_args[0][-1]
+        bus_mock.return_value.call_finish.return_value.unpack.return_value = ()
+        callback(bus_mock.return_value, Mock())
+        self.assertIsInstance(first_error.call_args[0][0], DBusCancelledError)
+        second_reply.assert_called_once_with()
+
+        cancellable_mock.side_effect = [first_handle, shared, second_handle]
+        thing._call("Pair")
+        thing._call("Pair")
+        on_first_cancelled = connect_mock.call_args_list[2][0][2]
+        on_second_cancelled = connect_mock.call_args_list[3][0][2]
+        on_first_cancelled(first_handle)
+        second_handle.is_cancelled.return_value = True
+        on_second_cancelled(second_handle)
+        shared.cancel.assert_called_once_with()
+
+        cancellable_mock.side_effect = lambda: Mock(**{"is_cancelled.return_value": False})
+        thing._call("Pair")
+        self.assertEqual(bus_mock.return_value.call.call_count, 3)
+
+        cancelled_callback = bus_mock.return_value.call.call_args_list[1][0][-1]
+        bus_mock.return_value.call_finish.side_effect = GLib.Error("Operation was cancelled")
+        cancelled_callback(bus_mock.return_value, Mock())
+        thing._call("Pair")
+        self.assertEqual(bus_mock.return_value.call.call_count, 3)
@@ -1,9 +1,131 @@
+import logging
+import timeit
+from typing import List
 from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from gi.repository import Gio, GLib
 
 from blueman.bluez.Manager import Manager
 from blueman.gobject import SingletonGObjectMeta
 
 
+def fake_objects(count: int) -> List[Mock]:
+    objects = []
+    for i in range(count):
+        address = ":".join(f"{b:02X}" for b in i.to_bytes(6, "big"))
+        object_path = f"/org/bluez/hci0/dev_{address.replace(':', '_')}"
+        proxy = Mock(spec=Gio.DBusProxy)
+        proxy.get_object_path.return_value = object_path
+        proxy.get_cached_property.side_effect = lambda name, address=address: {
+            "Address": GLib.Variant("s", address), "Adapter": GLib.Variant("o", "/org/bluez/hci0")}[name]
+
+        dbus_object = Mock()
+        dbus_object.get_object_path.return_value = object_path
+        dbus_object.get_interface.side_effect = lambda name, proxy=proxy: proxy if name == "org.bluez.Device1" else None
+        objects.append(dbus_object)
+    return objects
+
+
+class FakeDeviceProxy:
+    # Just what indexing reads, much cheaper to make by the thousands than mocks
+    def __init__(self, i: int) -> None:
+        self._address = ":".join(f"{b:02X}" for b in i.to_bytes(6, "big"))
+        self._object_path = f"/org/bluez/hci0/dev_{self._address.replace(':', '_')}"
+
+    def get_object_path(self) -> str:
+        return self._object_path
+
+    def get_cached_property(self, name: str) -> GLib.Variant:
+        return {"Address": GLib.Variant("s", self._address), "Adapter": GLib.Variant("o", "/org/bluez/hci0")}[name]
+
+
 class TestManager(TestCase):
     def test_metaclass(self):
         self.assertIsInstance(Manager, SingletonGObjectMeta)
+
+
+@patch("blueman.bluez.Manager.Device", Mock(side_effect=lambda obj_path: obj_path))
+@patch("blueman.bluez.Manager.PropertyCache", Mock())
+@patch("blueman.bluez.Manager.Gio.DBusObjectManagerClient.new_for_bus_sync")
+class TestDeviceIndex(TestCase):
+    def setUp(self) -> None:
+        Manager._instance = None
+
+    def tearDown(self) -> None:
+        Manager._instance = None
+
+    def _manager(self, object_manager_mock: Mock, count: int) -> Manager:
+        object_manager_mock.return_value.get_objects.return_value = fake_objects(count)
+        return Manager()
+
+    def test_find_device(self, object_manager_mock: Mock) -> None:
+        manager = self._manager(object_manager_mock, 3)
+        self.assertEqual(manager.find_device("00:00:00:00:00:02"), "/org/bluez/hci0/dev_00_00_00_00_00_02")
+        self.assertEqual(manager.find_device("00:00:00:00:00:02", "/org/bluez/hci0"),
+                         "/org/bluez/hci0/dev_00_00_00_00_00_02")
+        self.assertIsNone(manager.find_device("00:00:00:00:00:02", "/org/bluez/hci1"))
+        self.assertIsNone(manager.find_device("00:00:00:00:00:03"))
+
+    def test_object_removed(self, object_manager_mock: Mock) -> None:
+        manager = self._manager(object_manager_mock, 3)
+        removed = object_manager_mock.return_value.get_objects.return_value[1]
+        manager._on_object_removed(object_manager_mock.return_value, removed)
+        self.assertIsNone(manager.find_device("00:00:00:00:00:01"))
+        manager._on_object_added(object_manager_mock.return_value, removed)
+        self.assertIsNotNone(manager.find_device("00:00:00:00:00:01"))
+
+    def test_index_by_address(self, object_manager_mock: Mock) -> None:
+        manager = self._manager(object_manager_mock, 3)
+        self.assertEqual(manager._device_index["00:00:00:00:00:01"],
+                         {"/org/bluez/hci0": "/org/bluez/hci0/dev_00_00_00_00_00_01"})
+        self.assertEqual(len(manager._device_index), 3)
+
+    def test_lookup_cost_is_flat(self, object_manager_mock: Mock) -> None:
+        manager = self._manager(object_manager_mock, 10)
+
+        def lookup_time() -> float:
+            return min(timeit.repeat(lambda: manager.find_device("00:00:00:00:00:05"), number=1000, repeat=5))
+
+        few = lookup_time()
+        for i in range(10, 5000):
+            manager._index_device(FakeDeviceProxy(i))
+        many = lookup_time()
+
+        logging.info(f"1000 lookups: {few * 1000:.2f} ms with 10 devices, {many * 1000:.2f} ms with 5000 devices")
+        self.assertEqual(len(manager._device_index), 5000)
+        # Generous, a scan over the devices would be hundreds of times slower
+        self.assertLess(many, few * 10)
+
+
+@patch("blueman.bluez.Manager.PropertyCache")
+@patch("blueman.bluez.Manager.Gio.DBusObjectManagerClient.new_for_bus_sync")
+class TestObjectAdded(TestCase):
+    def setUp(self) -> None:
+        Manager._instance = None
+
+    def tearDown(self) -> None:
+        Manager._instance = None
+
+    def test_cache_created_first(self, object_manager_mock: Mock, cache_mock: Mock) -> None:
+        order = Mock()
+        order.attach_mock(cache_mock.get_instance, "cache")
+        order.attach_mock(object_manager_mock, "object_manager")
+        Manager()
+        self.assertEqual([name for name, _args, _kwargs in order.mock_calls if name in ("cache", "object_manager")],
+                         ["cache", "object_manager"])
+
+    def test_new_object_cached_from_proxy(self, object_manager_mock: Mock, cache_mock: Mock) -> None:
+        cache = cache_mock.get_instance.return_value
+        cache.is_complete.return_value = False
+        manager = Manager()
+
+        dbus_object = fake_objects(1)[0]
+        proxy = dbus_object.get_interface("org.bluez.Device1")
+        proxy.get_interface_name.return_value = "org.bluez.Device1"
+        proxy.get_cached_property_names.return_value = ["Address", "Adapter"]
+        manager.connect_signal("device-created", lambda _manager, _path: cache.store_all.assert_called_once_with(
+            "/org/bluez/hci0/dev_00_00_00_00_00_00", "org.bluez.Device1",
+            {"Address": "00:00:00:00:00:00", "Adapter": "/org/bluez/hci0"}))
+        manager._on_object_added(object_manager_mock.return_value, dbus_object)
+        cache.store_all.assert_called_once()
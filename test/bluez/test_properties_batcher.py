@@ -0,0 +1,50 @@
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from blueman.bluez.PropertiesBatcher import PropertiesBatcher
+
+
+@patch("blueman.bluez.PropertiesBatcher.GLib.timeout_add")
+@patch("blueman.bluez.PropertiesBatcher.time.monotonic")
+class TestPropertiesBatcher(TestCase):
+    def test_unthrottled_keys_pass_through(self, monotonic_mock: Mock, timeout_mock: Mock) -> None:
+        emit = Mock()
+        batcher = PropertiesBatcher(emit)
+        monotonic_mock.return_value = 100.0
+        batcher.push("/dev", {"Connected": True, "Alias": "Headset"})
+        emit.assert_called_once_with("/dev", {"Connected": True, "Alias": "Headset"})
+        timeout_mock.assert_not_called()
+
+    def test_throttled_key_is_held_until_window_passed(self, monotonic_mock: Mock, timeout_mock: Mock) -> None:
+        emit = Mock()
+        batcher = PropertiesBatcher(emit)
+        batcher.set_window("RSSI", 500)
+
+        monotonic_mock.return_value = 100.0
+        batcher.push("/dev", {"RSSI": -60})
+        emit.assert_called_once_with("/dev", {"RSSI": -60})
+
+        monotonic_mock.return_value = 100.1
+        batcher.push("/dev", {"RSSI": -61, "Connected": True})
+        batcher.push("/dev", {"RSSI": -62})
+        batcher.push("/other", {"RSSI": -70})
+        self.assertEqual(emit.call_args_list[1][0], ("/dev", {"Connected": True}))
+        self.assertEqual(emit.call_args_list[2][0], ("/other", {"RSSI": -70}))
+        timeout_mock.assert_called_once_with(400, batcher._flush, "/dev")
+
+        monotonic_mock.return_value = 100.5
+        self.assertFalse(batcher._flush("/dev"))
+        self.assertEqual(emit.call_args_list[3][0], ("/dev", {"RSSI": -62}))
+        self.assertEqual(emit.call_count, 4)
+
+    def test_expired_deliveries_are_pruned(self, monotonic_mock: Mock, timeout_mock: Mock) -> None:
+        batcher = PropertiesBatcher(Mock())
+        batcher.set_window("RSSI", 500)
+
+        monotonic_mock.return_value = 100.0
+        batcher.push("/gone", {"RSSI": -60})
+        self.assertIn(("/gone", "RSSI"), batcher._delivered)
+
+        monotonic_mock.return_value = 101.0
+        batcher.push("/dev", {"RSSI": -70})
+        self.assertEqual(list(batcher._delivered), [("/dev", "RSSI")])
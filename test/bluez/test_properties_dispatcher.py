@@ -0,0 +1,47 @@
+from unittest import TestCase
+from unittest.mock import patch, Mock, call
+
+from gi.repository import Gio, GLib
+
+from blueman.bluez.PropertiesDispatcher import PropertiesDispatcher
+
+
+def properties_changed(dispatcher: PropertiesDispatcher, path: str, interface_name: str, **changed: bool) -> None:
+    param = GLib.Variant("(sa{sv}as)", (interface_name, {k: GLib.Variant("b", v) for k, v in changed.items()}, []))
+    dispatcher._on_properties_changed(Mock(), ":1.1", path, "org.freedesktop.DBus.Properties", "PropertiesChanged",
+                                      param)
+
+
+@patch("blueman.bluez.PropertiesDispatcher.Gio.bus_get_sync")
+class TestPropertiesDispatcher(TestCase):
+    def test_single_subscription_per_interface(self, bus_mock: Mock) -> None:
+        dispatcher = PropertiesDispatcher(Gio.BusType.SYSTEM, "org.bluez")
+        first = dispatcher.add_listener("org.bluez.Device1", None, Mock())
+        second = dispatcher.add_listener("org.bluez.Device1", "/org/bluez/hci0/dev_00", Mock())
+        dispatcher.add_listener("org.bluez.Adapter1", None, Mock())
+
+        subscribe = bus_mock.return_value.signal_subscribe
+        self.assertEqual(subscribe.call_count, 2)
+        self.assertEqual(subscribe.call_args_list[0][0][4], "org.bluez.Device1")
+
+        dispatcher.remove_listener(first)
+        bus_mock.return_value.signal_unsubscribe.assert_not_called()
+        dispatcher.remove_listener(second)
+        bus_mock.return_value.signal_unsubscribe.assert_called_once()
+
+    def test_routing(self, _bus_mock: Mock) -> None:
+        dispatcher = PropertiesDispatcher(Gio.BusType.SYSTEM, "org.bluez")
+        order = Mock()
+        dispatcher.add_listener("org.bluez.Device1", None, order.any)
+        dispatcher.add_listener("org.bluez.Device1", "/org/bluez/hci0/dev_00", order.path)
+        dispatcher.add_listener("org.bluez.Device1", None, order.first, first=True)
+        dispatcher.add_listener("org.bluez.Adapter1", None, order.adapter)
+
+        properties_changed(dispatcher, "/org/bluez/hci0/dev_00", "org.bluez.Device1", Connected=True)
+        properties_changed(dispatcher, "/org/bluez/hci0/dev_01", "org.bluez.Device1", Connected=False)
+
+        args0 = ("/org/bluez/hci0/dev_00", "org.bluez.Device1", {"Connected": True}, [])
+        args1 = ("/org/bluez/hci0/dev_01", "org.bluez.Device1", {"Connected": False}, [])
+        self.assertEqual(order.mock_calls, [call.first(*args0), call.path(*args0), call.any(*args0),
+                                            call.first(*args1), call.any(*args1)])
+        self.assertEqual(set(dispatcher.get_rates()), {"org.bluez.Device1"})
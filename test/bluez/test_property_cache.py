@@ -0,0 +1,113 @@
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from gi.repository import Gio, GLib
+
+from blueman.bluez.PropertyCache import PropertyCache
+
+
+def objects_reply() -> GLib.Variant:
+    return GLib.Variant("(a{oa{sa{sv}}})", ({
+        "/org/bluez/hci0": {"org.bluez.Adapter1": {"Powered": GLib.Variant("b", True)}},
+        "/org/bluez/hci0/dev_00_00_00_00_00_01": {
+            "org.bluez.Device1": {"Alias": GLib.Variant("s", "Headset"), "Connected": GLib.Variant("b", False)},
+            "org.bluez.Battery1": {"Percentage": GLib.Variant("y", 80)},
+        },
+    },))
+
+
+@patch("blueman.bluez.PropertyCache.PropertiesDispatcher", Mock())
+@patch("blueman.bluez.PropertyCache.Gio.bus_get_sync")
+class TestPropertyCache(TestCase):
+    def _cache(self, bus_mock: Mock) -> PropertyCache:
+        bus_mock.return_value.call_sync.return_value = objects_reply()
+        cache = PropertyCache(Gio.BusType.SYSTEM, "org.bluez")
+        cache.track("org.bluez.Device1")
+        return cache
+
+    def test_loads_tracked_interfaces(self, bus_mock: Mock) -> None:
+        cache = self._cache(bus_mock)
+        self.assertEqual(cache.get("/org/bluez/hci0/dev_00_00_00_00_00_01", "org.bluez.Device1", "Alias"), "Headset")
+        self.assertRaises(KeyError, cache.get, "/org/bluez/hci0/dev_00_00_00_00_00_01", "org.bluez.Battery1",
+                          "Percentage")
+        self.assertEqual(cache.get_stats(), {"hits": 1, "misses": 1, "objects": 1})
+        bus_mock.return_value.call_sync.assert_called_once()
+
+    def test_properties_changed(self, bus_mock: Mock) -> None:
+        cache = self._cache(bus_mock)
+        path = "/org/bluez/hci0/dev_00_00_00_00_00_01"
+        cache.get(path, "org.bluez.Device1", "Alias")
+
+        cache._on_properties_changed(path, "org.bluez.Device1", {"Connected": True}, ["Alias"])
+
+        self.assertTrue(cache.get(path, "org.bluez.Device1", "Connected"))
+        self.assertRaises(KeyError, cache.get, path, "org.bluez.Device1", "Alias")
+
+    def test_invalidated_properties_are_dropped(self, bus_mock: Mock) -> None:
+        cache = self._cache(bus_mock)
+        path = "/org/bluez/hci0/dev_00_00_00_00_00_01"
+        self.assertEqual(cache.get_all(path, "org.bluez.Device1"), {"Alias": "Headset", "Connected": False})
+
+        cache._on_properties_changed(path, "org.bluez.Device1", {}, ["Alias"])
+        self.assertEqual(cache.get_all(path, "org.bluez.Device1"), {"Connected": False})
+        self.assertEqual([object_path for object_path, _props in cache.get_objects("org.bluez.Device1")], [path])
+
+        cache.store_all(path, "org.bluez.Device1", {"Alias": "Speaker", "Connected": False})
+        self.assertEqual(cache.get_all(path, "org.bluez.Device1")["Alias"], "Speaker")
+
+    def test_interfaces_added_and_removed(self, bus_mock: Mock) -> None:
+        cache = self._cache(bus_mock)
+        path = "/org/bluez/hci0/dev_00_00_00_00_00_02"
+
+        added = GLib.Variant("(oa{sa{sv}})", (path, {"org.bluez.Device1": {"Alias": GLib.Variant("s", "Mouse")}}))
+        cache._on_interfaces_added(Mock(), ":1.1", "/", "org.freedesktop.DBus.ObjectManager", "InterfacesAdded",
+                                   added)
+        self.assertEqual(cache.get(path, "org.bluez.Device1", "Alias"), "Mouse")
+
+        removed = GLib.Variant("(oas)", (path, ["org.bluez.Device1"]))
+        cache._on_interfaces_removed(Mock(), ":1.1", "/", "org.freedesktop.DBus.ObjectManager", "InterfacesRemoved",
+                                     removed)
+        self.assertRaises(KeyError, cache.get, path, "org.bluez.Device1", "Alias")
+
+    def test_changes_since(self, bus_mock: Mock) -> None:
+        cache = self._cache(bus_mock)
+        path = "/org/bluez/hci0/dev_00_00_00_00_00_01"
+        self.assertEqual(cache.changes_since(0, "org.bluez.Device1"), ([path], []))
+        generation = cache.generation
+
+        cache._on_properties_changed(path, "org.bluez.Device1", {"Connected": True}, [])
+        self.assertEqual(cache.changes_since(generation, "org.bluez.Device1"), ([path], []))
+        self.assertEqual(cache.changes_since(cache.generation, "org.bluez.Device1"), ([], []))
+        generation = cache.generation
+
+        removed = GLib.Variant("(oas)", (path, ["org.bluez.Device1"]))
+        cache._on_interfaces_removed(Mock(), ":1.1", "/", "org.freedesktop.DBus.ObjectManager", "InterfacesRemoved",
+                                     removed)
+        self.assertEqual(cache.changes_since(generation, "org.bluez.Device1"), ([], [path]))
+
+        cache.clear()
+        self.assertIsNone(cache.changes_since(generation, "org.bluez.Device1"))
+
+    def test_partially_read_objects_are_read_again(self, bus_mock: Mock) -> None:
+        cache = self._cache(bus_mock)
+        path = "/org/bluez/hci0/dev_00_00_00_00_00_02"
+        cache.get_all("/org/bluez/hci0/dev_00_00_00_00_00_01", "org.bluez.Device1")
+        generation = cache.generation
+        cache.store(path, "org.bluez.Device1", "Alias", "Mouse")
+        self.assertEqual(cache.changes_since(generation, "org.bluez.Device1"), ([path], []))
+        self.assertRaises(KeyError, cache.get_all, path, "org.bluez.Device1")
+
+        bus_mock.return_value.call_sync.return_value = GLib.Variant(
+            "(a{sv})", ({"Alias": GLib.Variant("s", "Mouse"), "Connected": GLib.Variant("b", False)},))
+        self.assertIn((path, {"Alias": "Mouse", "Connected": False}), list(cache.get_objects("org.bluez.Device1")))
+        self.assertEqual(cache.get_all(path, "org.bluez.Device1")["Connected"], False)
+
+    def test_owner_change_reloads(self, bus_mock: Mock) -> None:
+        cache = self._cache(bus_mock)
+        cache.get("/org/bluez/hci0/dev_00_00_00_00_00_01", "org.bluez.Device1", "Alias")
+
+        param = GLib.Variant("(sss)", ("org.bluez", ":1.1", ":1.2"))
+        cache._on_name_owner_changed(Mock(), "org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus",
+                                     "NameOwnerChanged", param)
+        cache.get("/org/bluez/hci0/dev_00_00_00_00_00_01", "org.bluez.Device1", "Alias")
+        self.assertEqual(bus_mock.return_value.call_sync.call_count, 2)
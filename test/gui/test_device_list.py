@@ -0,0 +1,124 @@
+import logging
+import time
+from typing import List
+from unittest import TestCase, skipIf
+from unittest.mock import patch, Mock
+
+import gi
+gi.require_version("Gtk", "3.0")
+gi.require_version("Gdk", "3.0")
+from gi.repository import Gdk, GLib, Gtk
+
+from blueman.bluemantyping import ObjectPath
+from blueman.gui.DeviceList import DeviceList
+
+
+def device_records(count: int) -> List[Mock]:
+    return [Mock(object_path=ObjectPath(f"/org/bluez/hci0/dev_{i:012X}"), adapter="/org/bluez/hci0")
+            for i in range(count)]
+
+
+@skipIf(Gdk.Display.get_default() is None, "needs a display")
+@patch("blueman.gui.DeviceList.AnyAdapter", Mock())
+@patch("blueman.gui.DeviceList.AnyDevice", Mock())
+@patch("blueman.gui.DeviceList.Device")
+@patch("blueman.gui.DeviceList.Manager")
+class TestPopulateDevices(TestCase):
+    def _device_list(self, manager_mock: Mock, device_mock: Mock, count: int) -> DeviceList:
+        adapter = Mock()
+        adapter.get_object_path.return_value = "/org/bluez/hci0"
+        manager_mock.return_value.get_adapters.return_value = [adapter]
+        manager_mock.return_value.snapshot.return_value.devices = device_records(count)
+        device_mock.return_value.__getitem__.return_value = "/org/bluez/hci0"
+        device_mock.return_value.__contains__.return_value = True
+        return DeviceList()
+
+    def _populate(self, manager_mock: Mock, device_mock: Mock, count: int) -> DeviceList:
+        device_list = self._device_list(manager_mock, device_mock, count)
+        device_list.populate_devices()
+        return device_list
+
+    def _shown(self, device_list: DeviceList) -> Gtk.Window:
+        window = Gtk.Window()
+        window.add(device_list)
+        window.show_all()
+        self.addCleanup(window.destroy)
+        context = GLib.MainContext.default()
+        while context.pending():
+            context.iteration(False)
+        return window
+
+    def test_first_rows_before_idle(self, manager_mock: Mock, device_mock: Mock) -> None:
+        device_list = self._populate(manager_mock, device_mock, 1000)
+        self.assertEqual(len(device_list.liststore), DeviceList.populate_first_rows)
+
+        context = GLib.MainContext.default()
+        while "complete" not in device_list.populate_stats:
+            context.iteration(True)
+
+        self.assertEqual(len(device_list.liststore), 1000)
+        self.assertLess(device_list.populate_stats["first_rows"], device_list.populate_stats["complete"])
+        manager_mock.return_value.populate_batteries.assert_called_once_with("/org/bluez/hci0")
+
+    def test_selection_kept_while_populating(self, manager_mock: Mock, device_mock: Mock) -> None:
+        device_list = self._populate(manager_mock, device_mock, 1000)
+        device_list.selection.select_path(Gtk.TreePath.new_from_indices([3]))
+        selected = device_list.get(device_list.selected(), "dbus_path")
+
+        context = GLib.MainContext.default()
+        while "complete" not in device_list.populate_stats:
+            context.iteration(True)
+
+        self.assertEqual(device_list.get(device_list.selected(), "dbus_path"), selected)
+
+    @patch("blueman.gui.DeviceList.DeviceList.adapter_cache_size", 1)
+    def test_rows_cached_per_adapter(self, manager_mock: Mock, device_mock: Mock) -> None:
+        device_list = self._populate(manager_mock, device_mock, 100)
+        context = GLib.MainContext.default()
+        while "complete" not in device_list.populate_stats:
+            context.iteration(True)
+        store = device_list.liststore
+
+        other = Mock()
+        other.get_object_path.return_value = "/org/bluez/hci1"
+        manager_mock.return_value.get_adapter.return_value = other
+        device_list.set_adapter("hci1")
+        self.assertIsNot(device_list.liststore, store)
+        self.assertEqual(len(device_list.liststore), 0)
+
+        manager_mock.return_value.get_adapter.return_value = manager_mock.return_value.get_adapters.return_value[0]
+        manager_mock.return_value.since.return_value = Mock(devices=(), removed_devices=())
+        manager_mock.return_value.snapshot.reset_mock()
+        device_list.set_adapter("hci0")
+        device_list.populate_devices()
+        self.assertIs(device_list.liststore, store)
+        self.assertEqual(len(device_list.liststore), 100)
+        manager_mock.return_value.snapshot.assert_not_called()
+
+    def test_benchmark(self, manager_mock: Mock, device_mock: Mock) -> None:
+        count = 2000
+        context = GLib.MainContext.default()
+
+        # What populating used to do, every row added and shown as its device-created signal came in
+        device_list = self._device_list(manager_mock, device_mock, count)
+        self._shown(device_list)
+        start = time.monotonic()
+        for record in manager_mock.return_value.snapshot.return_value.devices:
+            device_list.add_device(record.object_path)
+        while context.pending():
+            context.iteration(False)
+        all_at_once = time.monotonic() - start
+
+        device_list = self._device_list(manager_mock, device_mock, count)
+        self._shown(device_list)
+        device_list.populate_devices()
+        while "complete" not in device_list.populate_stats or "first_paint" not in device_list.populate_stats:
+            context.iteration(True)
+        stats = device_list.populate_stats
+
+        logging.info(f"{count} rows: first rows after {stats['first_rows'] * 1000:.1f} ms, first paint after "
+                     f"{stats['first_paint'] * 1000:.1f} ms, complete after {stats['complete'] * 1000:.1f} ms, "
+                     f"{all_at_once * 1000:.1f} ms all at once")
+        self.assertEqual(len(device_list.liststore), count)
+        self.assertLess(stats["first_rows"], all_at_once)
+        self.assertLess(stats["first_paint"], all_at_once)
@@ -0,0 +1,52 @@
+import time
+from unittest import TestCase, skipIf
+
+import gi
+gi.require_version("Gtk", "3.0")
+gi.require_version("Gdk", "3.0")
+from gi.repository import Gdk, Gtk
+
+from blueman.gui.GenericList import GenericList
+
+
+@skipIf(Gdk.Display.get_default() is None, "needs a display")
+class TestGenericList(TestCase):
+    rows = 500
+
+    def setUp(self) -> None:
+        self.list = GenericList([
+            {"id": "caption", "type": str, "renderer": Gtk.CellRendererText(), "render_attrs": {"markup": 0}},
+            {"id": "alias", "type": str},
+            {"id": "connected", "type": bool},
+            {"id": "rssi", "type": float},
+        ])
+        for i in range(self.rows):
+            self.list.append(caption=f"<b>{i}</b>", alias=f"Device {i}", connected=bool(i % 2), rssi=float(i))
+
+    def test_get_values(self) -> None:
+        tree_iter = self.list.liststore.get_iter_first()
+        assert tree_iter is not None
+        self.assertEqual(self.list.get_values(tree_iter, "rssi", "alias"), (0.0, "Device 0"))
+        self.assertEqual(self.list.get_value(tree_iter, "caption"), "<b>0</b>")
+        self.assertEqual(self.list.get(tree_iter, "alias", "unknown"), {"alias": "Device 0"})
+        self.assertEqual(list(self.list.get(tree_iter)), ["caption", "alias", "connected", "rssi"])
+
+    def test_benchmark(self) -> None:
+        # what a redraw of all rows reads, once through dictionaries and once through tuples
+        iters = [row.iter for row in self.list.liststore]
+        passes = 20
+
+        start = time.perf_counter()
+        for _ in range(passes):
+            for tree_iter in iters:
+                row = self.list.get(tree_iter, "caption", "connected", "rssi")
+                row["caption"], row["connected"], row["rssi"]
+        with_dicts = (time.perf_counter() - start) / passes
+
+        start = time.perf_counter()
+        for _ in range(passes):
+            for tree_iter in iters:
+                self.list.get_values(tree_iter, "caption", "connected", "rssi")
+        with_tuples = (time.perf_counter() - start) / passes
+
+        self.assertLess(with_tuples, with_dicts)
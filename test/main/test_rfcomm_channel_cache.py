@@ -0,0 +1,47 @@
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from blueman.main.RFCOMMChannelCache import RFCOMMChannelCache
+
+
+@patch("blueman.main.RFCOMMChannelCache.resolve_rfcomm_channel")
+class TestRFCOMMChannelCache(TestCase):
+    def test_lookups_are_shared_and_cached(self, resolve_mock: Mock) -> None:
+        cache = RFCOMMChannelCache()
+        first, second, error = Mock(), Mock(), Mock()
+        cache.resolve("00:00:00:00:00:01", 0x1103, first, error)
+        cache.resolve("00:00:00:00:00:01", 0x1103, second, error)
+        resolve_mock.assert_called_once()
+
+        resolve_mock.call_args[0][2](3)
+        first.assert_called_once_with(3)
+        second.assert_called_once_with(3)
+
+        third = Mock()
+        cache.resolve("00:00:00:00:00:01", 0x1103, third, error)
+        third.assert_called_once_with(3)
+        resolve_mock.assert_called_once()
+        error.assert_not_called()
+
+    def test_failure_is_not_cached(self, resolve_mock: Mock) -> None:
+        cache = RFCOMMChannelCache()
+        error = Mock()
+        cache.resolve("00:00:00:00:00:01", 0x1101, Mock(), error)
+        resolve_mock.call_args[0][2](None)
+        error.assert_called_once()
+        self.assertIsNone(cache.get("00:00:00:00:00:01", 0x1101))
+
+    @patch("blueman.main.RFCOMMChannelCache.time.monotonic")
+    def test_expiry_and_invalidation(self, monotonic_mock: Mock, resolve_mock: Mock) -> None:
+        cache = RFCOMMChannelCache()
+        monotonic_mock.return_value = 100.0
+        cache._store(("00:00:00:00:00:01", 0x1103), 3)
+        cache._store(("00:00:00:00:00:02", 0x1103), 4)
+        self.assertEqual(cache.get("00:00:00:00:00:01", 0x1103), 3)
+
+        monotonic_mock.return_value = 100.0 + cache.ttl
+        self.assertIsNone(cache.get("00:00:00:00:00:01", 0x1103))
+
+        monotonic_mock.return_value = 100.0
+        cache.invalidate("00:00:00:00:00:02")
+        self.assertIsNone(cache.get("00:00:00:00:00:02", 0x1103))